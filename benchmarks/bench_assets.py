@@ -0,0 +1,25 @@
+import tempfile
+
+from scripts.assets import AssetManager
+from benchmarks.common import scratch_dir
+
+PATHS = ['entities/boss/idle', 'entities/enemy/idle', 'entities/player/idle', 'particles/particle']
+
+def benchmarks(game):
+    '''
+    loading every image the game uses, decoding the pngs each time vs reading the cached atlases
+    (game) -> (list of (name, fn))
+    '''
+    def load(manager):
+        for path in PATHS:
+            manager.images(path)
+        manager.image('black.jpg')
+
+    def decode():
+        load(AssetManager(cache_path=None))
+
+    cache_path = tempfile.mkdtemp(dir=scratch_dir()) + '/'
+    load(AssetManager(cache_path=cache_path)) # fill the cache
+    def cached():
+        load(AssetManager(cache_path=cache_path))
+    return [('assets/load/decode', decode), ('assets/load/cached_atlas', cached)]
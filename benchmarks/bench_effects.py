@@ -0,0 +1,30 @@
+import math
+import random
+
+from scripts.particle import ParticleSystem
+from scripts.spark import SparkSystem
+
+def benchmarks(game):
+    '''
+    particle and spark pool updates (and particle drawing) with 1k and 10k live at once
+    (game) -> (list of (name, fn))
+    '''
+    cases = []
+    rng = random.Random(0)
+    for count in [1000, 10000]:
+        particles = ParticleSystem(game.assets['particle/particle'], capacity=count)
+        particles.spawn((570, 405), [(rng.random() - 0.5, rng.random() - 0.5) for i in range(count)])
+        particles.lifetime[:] = 10 ** 9 # keep them all alive while timing
+        cases.append((f'effects/particles_update/{count}', particles.update))
+
+        sparks = SparkSystem(capacity=count)
+        sparks.spawn((570, 405), [rng.random() * math.pi * 2 for i in range(count)], 10 ** 9)
+        cases.append((f'effects/sparks_update/{count}', sparks.update))
+
+        shown = ParticleSystem(game.assets['particle/particle'], capacity=count)
+        shown.spawn((570, 405), [(rng.random() - 0.5, rng.random() - 0.5) for i in range(count)])
+        shown.frame[:] = [rng.randrange(shown.lifetime[0]) for i in range(count)] # spread over the whole animation
+        def render(shown=shown):
+            shown.render(game.display)
+        cases.append((f'effects/particles_render/{count}', render))
+    return cases
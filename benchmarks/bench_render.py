@@ -0,0 +1,40 @@
+import pygame
+
+from scripts.entities import Enemies
+from scripts.utils import SpriteStack, WORLD_SIZE
+from scripts.dirty import DirtyRects
+from scripts.present import Presenter
+
+def benchmarks(game):
+    '''
+    PhysicsEntity.render for 9, 15 and 21 layer stacks, flattened and layer by layer
+    and a whole frame (render + present) with 40 enemies on screen, full screen vs dirty rects
+    Presenter.present at render scale 1 (straight blit) and 0.5 (drawn at half resolution, scaled up into the cached target)
+    (game) -> (list of (name, fn))
+    '''
+    cases = []
+    images = game.assets['player/stack'].images
+    enemy = Enemies(game, [600, 400], [16, 16])
+    for layers in [9, 15, 21]:
+        for flatten in [True, False]:
+            stack = SpriteStack(images[:layers], rotations=game.rotation_cache, flatten=flatten)
+            angles = iter(range(10 ** 9))
+            def render(stack=stack, angles=angles):
+                enemy.render(game.display, stack, next(angles) % 360, offset=(19, 13))
+                game.sprites.clear()
+            cases.append((f"entity_render/{layers}_layers/{'flat' if flatten else 'layers'}", render))
+
+    crowd = [Enemies(game, [100 + (i % 10) * 90, 150 + (i // 10) * 120], [16, 16]) for i in range(40)]
+    def frame(dirty):
+        game.enemies, game.dirty = crowd, dirty
+        game.render()
+        game.present()
+        game.enemies, game.dirty = [], None
+    cases.append(('frame/40_enemies/full', lambda: frame(None)))
+    cases.append(('frame/40_enemies/dirty_rects', lambda dirty=DirtyRects(game.display.get_size()): frame(dirty)))
+
+    for render_scale in [1, 0.5]:
+        presenter = Presenter(WORLD_SIZE, render_scale)
+        presenter.open(pygame.Surface(presenter.size)) # not the benchmark game's window
+        cases.append((f'present/scale_{render_scale}', lambda presenter=presenter, display=presenter.make_display(): presenter.present(display, game.assets['background'])))
+    return cases
@@ -0,0 +1,18 @@
+from scripts.UI import Text, text_cache
+
+def benchmarks(game):
+    '''
+    Text.render when the text is unchanged (the HUD most frames) and when it changes every call
+    (game) -> (list of (name, fn))
+    '''
+    score = Text('Score: 12', pos=(540, 13))
+    def cached():
+        score.render(game.display, 22)
+
+    counter = Text('', pos=(540, 13))
+    values = iter(range(10 ** 9))
+    def changing():
+        counter.level = 'Score: ' + str(next(values))
+        counter.render(game.display, 22)
+        text_cache.clear()
+    return [('text/render/cached', cached), ('text/render/changing', changing)]
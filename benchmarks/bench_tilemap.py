@@ -0,0 +1,63 @@
+import os
+import random
+
+from benchmarks.common import map_data, write_map, make_tilemap
+from scripts.tilemap import Tilemap, BINARY_EXTENSION
+
+def benchmarks(game):
+    '''
+    Tilemap.render, physics_rects_around, solid_check(_many) and load on big synthetic maps
+    (game) -> (list of (name, fn))
+    '''
+    cases = []
+    tilemap = make_tilemap(game, 256, 256, fill=0.6, offgrid=500)
+    scrolls = [(random.Random(i).randrange(0, 3000), random.Random(i + 1).randrange(0, 3000)) for i in range(64)]
+    frames = iter(range(10 ** 9))
+    def render():
+        tilemap.render(game.display, offset=scrolls[next(frames) % len(scrolls)])
+    cases.append(('tilemap/render/256x256', render))
+
+    def render_static():
+        tilemap.render(game.display, offset=(19, 13))
+    cases.append(('tilemap/render_static/256x256', render_static))
+
+    rng = random.Random(0)
+    points = [(rng.random() * 4096, rng.random() * 4096) for i in range(100)]
+    def physics_rects_around():
+        for pos in points:
+            tilemap.physics_rects_around(pos)
+    cases.append(('tilemap/physics_rects_around/x100', physics_rects_around))
+
+    def solid_check():
+        for pos in points:
+            tilemap.solid_check(pos)
+    cases.append(('tilemap/solid_check/x100', solid_check))
+
+    def solid_check_many():
+        tilemap.solid_check_many(points)
+    cases.append(('tilemap/solid_check_many/x100', solid_check_many))
+
+    def extract():
+        tilemap.extract([('grass', 3), ('decor', 1)], keep=True)
+    cases.append(('tilemap/extract_keep/256x256', extract))
+
+    cells = [(int(x // 16), int(y // 16)) for x, y in points]
+    def autotile_around():
+        for x, y in cells:
+            tilemap.autotile_around(x, y)
+    cases.append(('tilemap/autotile_around/x100', autotile_around))
+
+    for size in [256, 512]:
+        path = write_map(map_data(size, size, fill=0.6))
+        def load(path=path):
+            Tilemap(game, tile_size=16).load(path)
+        cases.append((f'tilemap/load/{size}x{size}_{os.path.getsize(path) // 1024 // 1024}MB', load))
+
+        binary = path[:-len('.json')] + BINARY_EXTENSION
+        tilemap = Tilemap(game, tile_size=16)
+        tilemap.load(path)
+        tilemap.save(binary)
+        def load_binary(path=binary):
+            Tilemap(game, tile_size=16).load(path)
+        cases.append((f'tilemap/load_binary/{size}x{size}', load_binary))
+    return cases
@@ -0,0 +1,24 @@
+import numpy as np
+
+from scripts.vecenv import VecEnv
+
+def benchmarks(game):
+    '''
+    VecEnv.step for 4096 games with random actions, and observe() with 6 enemies in every game
+    (game) -> (list of (name, fn))
+    '''
+    cases = []
+    count = 4096
+    env = VecEnv(count, seed=0)
+    actions = np.random.default_rng(0).integers(0, 3, size=(64, count))
+    ticks = [0]
+    def step():
+        env.step(actions[ticks[0] % len(actions)])
+        ticks[0] += 1
+    cases.append((f'vecenv/step/{count}', step))
+
+    crowded = VecEnv(count, seed=0)
+    games = np.repeat(np.arange(count), 6)
+    crowded.spawn(games, 0, np.column_stack([np.full(len(games), 50.0), np.random.default_rng(0).uniform(60, 300, len(games))]))
+    cases.append((f'vecenv/observe/{count}x6', crowded.observe))
+    return cases
@@ -0,0 +1,83 @@
+import os
+import json
+import random
+import tempfile
+
+import pygame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+scratch = None # TemporaryDirectory the benchmarks write their files to, made when first needed
+
+def scratch_dir():
+    '''
+    one temporary directory for every file the benchmarks write, removed by cleanup() when the run ends
+    () -> (path)
+    '''
+    global scratch
+    if scratch is None:
+        scratch = tempfile.TemporaryDirectory(prefix='benchmarks_')
+    return scratch.name
+
+def cleanup():
+    '''
+    removes the scratch directory and everything in it
+    '''
+    global scratch
+    if scratch is not None:
+        scratch.cleanup()
+        scratch = None
+
+def make_game():
+    '''
+    headless Game to borrow assets, caches and pools from, plus plain tile images for synthetic maps
+    () -> (Game)
+    '''
+    os.chdir(ROOT) # assets are loaded relative to the repo
+    from game import Game
+    random.seed(0)
+    game = Game(headless=True)
+    for i, tile_type in enumerate(['grass', 'stone', 'decor']):
+        variants = []
+        for variant in range(9):
+            img = pygame.Surface((16, 16))
+            img.fill((40 * i, 20 * variant, 100))
+            variants.append(img.convert())
+        game.assets[tile_type] = variants
+    return game
+
+def map_data(width, height, fill=0.5, offgrid=0, seed=0):
+    '''
+    a random map in the same json layout Tilemap.save writes
+    (width in tiles, height in tiles, fraction of cells with a tile, offgrid decorations, seed) -> (dict)
+    '''
+    rng = random.Random(seed)
+    tilemap = {}
+    for x in range(width):
+        for y in range(height):
+            if rng.random() < fill:
+                tilemap[str(x) + ';' + str(y)] = {'type': rng.choice(['grass', 'stone']), 'variant': rng.randrange(9), 'pos': [x, y]}
+    decor = [{'type': 'decor', 'variant': rng.randrange(9), 'pos': [rng.random() * width * 16, rng.random() * height * 16]} for i in range(offgrid)]
+    return {'tilemap': tilemap, 'tile_size': 16, 'offgrid': decor}
+
+def write_map(data, suffix='.json'):
+    '''
+    writes map data to a file in the scratch directory
+    (map dict, file extension) -> (path)
+    '''
+    f = tempfile.NamedTemporaryFile('w', suffix=suffix, dir=scratch_dir(), delete=False)
+    json.dump(data, f)
+    f.close()
+    return f.name
+
+def make_tilemap(game, width, height, fill=0.5, offgrid=0):
+    '''
+    a Tilemap loaded with a random map, through the normal load path
+    (game, width in tiles, height in tiles, fill fraction, offgrid decorations) -> (Tilemap)
+    '''
+    from scripts.tilemap import Tilemap
+    path = write_map(map_data(width, height, fill, offgrid))
+    tilemap = Tilemap(game, tile_size=16)
+    tilemap.load(path)
+    os.remove(path)
+    return tilemap
@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import importlib
+
+import pygame
+
+from benchmarks.common import ROOT, make_game, cleanup
+
+MODULES = ['bench_render', 'bench_tilemap', 'bench_text', 'bench_effects', 'bench_assets', 'bench_vecenv']
+RESULTS_PATH = os.path.join(ROOT, 'benchmarks', 'results.json')
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+def measure(fn, repeat=5, min_time=0.2):
+    '''
+    times a function like timeit does, picks how many calls make up a run then keeps the best run
+    (function, runs, rough seconds per run) -> (dict of seconds per call)
+    '''
+    fn() # warm up caches
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = sorted(t / number for t in timer.repeat(repeat=repeat, number=number))
+    return {'seconds': runs[0], 'median': runs[len(runs) // 2], 'number': number, 'repeat': repeat}
+
+def run(names=None, repeat=5, min_time=0.2):
+    '''
+    runs every benchmark (or the ones whose name contains one of names)
+    (list of name filters, runs per benchmark, rough seconds per run) -> (results dict)
+    '''
+    game = make_game()
+    results = {}
+    try:
+        for module in MODULES:
+            for name, fn in importlib.import_module('benchmarks.' + module).benchmarks(game):
+                if names and not any(n in name for n in names):
+                    continue
+                results[name] = measure(fn, repeat, min_time)
+                print(f"{name:50s} {results[name]['seconds'] * 1e6:12.1f} us")
+    finally:
+        cleanup() # temporary maps and asset caches
+    return {
+        'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(), 'pygame': pygame.version.ver, 'platform': platform.platform()},
+        'results': results,
+    }
+
+def compare(results, baseline, threshold):
+    '''
+    compares results against a baseline, anything slower by more than threshold counts as a regression
+    (results dict, baseline dict, allowed slowdown e.g. 0.15) -> (list of regressed names)
+    '''
+    regressions = []
+    print(f"\n{'benchmark':50s} {'baseline':>12s} {'now':>12s} {'change':>8s}")
+    for name, result in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['seconds']
+        change = result['seconds'] / before - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:50s} {before * 1e6:10.1f}us {result['seconds'] * 1e6:10.1f}us {change * 100:+7.1f}%{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark the game hot paths headless and compare against a baseline')
+    parser.add_argument('names', nargs='*', help='only run benchmarks whose name contains one of these')
+    parser.add_argument('--output', default=RESULTS_PATH, help='where to write the results json')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline json to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown before it counts as a regression (0.15 = 15%%)')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='rough seconds per timed run')
+    args = parser.parse_args(argv)
+
+    results = run(args.names, args.repeat, args.min_time)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nsaved baseline to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'\nno baseline at {args.baseline}, run with --save-baseline to make one')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold * 100:.0f}%')
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,23 @@
+import sys
+import argparse
+
+from scripts.tilemap import Tilemap
+
+def convert(source, target):
+    '''
+    converts a map between the json and binary formats, the format comes from each file's extension
+    (path to read, path to write)
+    '''
+    tilemap = Tilemap(None)
+    tilemap.load(source)
+    tilemap.save(target)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='convert maps between json and the binary .tmap format')
+    parser.add_argument('source')
+    parser.add_argument('target')
+    args = parser.parse_args(argv)
+    convert(args.source, args.target)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,8 +1,9 @@
 import sys
 import pygame
 
-from scripts.utils import load_images, Animation
-from scripts.tilemap import Tilemap
+from scripts.utils import Animation
+from scripts.assets import AssetManager
+from scripts.tilemap import Tilemap, AUTOTILE_TYPES
 
 RENDER_SCALE = 2.0
 
@@ -22,8 +23,9 @@ class Editor:
 
         self.clock = pygame.time.Clock()
         
+        self.loader = AssetManager()
         self.assets = {
-            'spawners': load_images('tiles/spawners')
+            'spawners': self.loader.images('tiles/spawners')
         }
         
         self.movement = [False, False, False, False] # camera movement in all 4 directions
@@ -79,17 +81,20 @@ class Editor:
                 self.display.blit(current_tile_img, mpos)
 
             if self.clicking and self.ongrid: # assing positon on tile map to that asset
-                self.tilemap.tilemap[str(tile_pos[0]) + ';' + str(tile_pos[1])] = {'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': tile_pos}
+                tile = self.tilemap.get_tile(tile_pos[0], tile_pos[1])
+                tile_type = self.tile_list[self.tile_group]
+                # autotiled types pick their own variant, painting over one of the same type would undo that every frame
+                if tile is None or tile['type'] != tile_type or (tile['variant'] != self.tile_variant and tile_type not in AUTOTILE_TYPES):
+                    self.tilemap.set_tile(tile_pos[0], tile_pos[1], tile_type, self.tile_variant)
+                    self.tilemap.autotile_around(tile_pos[0], tile_pos[1]) # keep autotiling live while painting
             if self.right_clicking:
-                tile_loc = str(tile_pos[0]) + ';' + str(tile_pos[1])
-                if tile_loc in self.tilemap.tilemap:
-                    # if location exists
-                    del self.tilemap.tilemap[tile_loc]
+                if self.tilemap.remove_tile(tile_pos[0], tile_pos[1]) is not None: # does nothing if there's no tile there
+                    self.tilemap.autotile_around(tile_pos[0], tile_pos[1])
                 for tile in self.tilemap.offgrid_tiles.copy(): # take a copy of refernce so we dont mess up the actual iteration
                     tile_img = self.assets[tile['type']][tile['variant']]
                     tile_r = pygame.Rect(tile['pos'][0] - self.scroll[0], tile['pos'][1] - self.scroll[1], tile_img.get_width(), tile_img.get_height())
                     if tile_r.collidepoint(mpos): # if this tile is colliding with mouse
-                        self.tilemap.offgrid_tiles.remove(tile)
+                        self.tilemap.remove_offgrid(tile)
 
             self.display.blit(current_tile_img, (5,5))
 
@@ -101,7 +106,7 @@ class Editor:
                     if event.button == 1: # left click, places
                         self.clicking = True
                         if not self.ongrid:
-                            self.tilemap.offgrid_tiles.append({'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': (mpos[0] + self.scroll[0], mpos[1] + self.scroll[1])})
+                            self.tilemap.add_offgrid({'type': self.tile_list[self.tile_group], 'variant': self.tile_variant, 'pos': (mpos[0] + self.scroll[0], mpos[1] + self.scroll[1])})
                     if event.button == 3: # right click
                         self.right_clicking = True
                 if event.type == pygame.MOUSEBUTTONUP:
@@ -1,73 +1,121 @@
 import sys
 import os
+import argparse
 import math
 import random
 import pygame
 
-from scripts.utils import load_image, load_images, Animation
-from scripts.entities import Player, Enemies, Boss
-from scripts.tilemap import Tilemap
-from scripts.particle import Particle
-from scripts.spark import Spark
+from scripts.utils import Animation, RotationCache, SpriteStack, WORLD_SIZE, scale_image
+from scripts.assets import AssetManager
+from scripts.audio import AudioManager
+from scripts.entities import Player, Enemies, Boss, burst, death_burst
+from scripts.pool import EntityPool
+from scripts.tilemap import Tilemap, BINARY_EXTENSION
+from scripts.particle import ParticleSystem
+from scripts.spark import SparkSystem
 from scripts.UI import Heart, Text
+from scripts.effects import Effects
+from scripts.spatial import SpatialHash
+from scripts.dirty import DirtyRects
+from scripts.present import Presenter
+from scripts.profiler import Profiler
+from scripts.telemetry import Telemetry
+from scripts.replay import InputRecorder, REPLAY_SEEDS
 
 class Game:
-    def __init__(self):
+    def __init__(self, entity_pool=False, headless=False, dirty_rects=False, render_scale=1, profile=False, telemetry=None, trace_memory=False, seed=None, record=None):
         '''
         initializes Game
+        (entity_pool: keep enemies and bosses in numpy arrays instead of objects, for very large enemy counts,
+         headless: no real window and no audio, for benchmarks and servers,
+         dirty_rects: only redraw and update the parts of the screen that changed, for slow machines,
+         render_scale: resolution the frame gets drawn at as a fraction of the window's, 0.5 draws at 570x405 and scales that up to the 1140x810 window, for weak hardware,
+         profile: time every phase of the frame from the start, F3 shows the overlay (and profiles while it's up) either way,
+         telemetry: .csv or .jsonl file to record frame times, counts and memory to every frame, for soak runs,
+         trace_memory: also track python allocations with tracemalloc in the telemetry, much slower,
+         seed: seeds random so the same inputs always play out the same, None leaves it alone,
+         record: file to record the seed and key presses to, scripts.replay plays it back)
         '''
-        pygame.init()
-
-        x = (1140, 810)
+        self.headless = headless
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy' # surfaces still work, nothing gets shown
+            pygame.display.init()
+            pygame.font.init()
+        else:
+            pygame.init()
 
         # change the window caption
         pygame.display.set_caption("Fuck you My Water is Nice")
         # create window
-        self.screen = pygame.display.set_mode((1140, 810)) # (640, 480), (960, 720), (768, 576)
-        self.display = pygame.Surface(x, pygame.SRCALPHA) # render on smaller resolution then scale it up to bigger screen
+        # the game plays out in WORLD_SIZE px and the window is that size, the display is render_scale times it and gets scaled up to the window
+        self.render_scale = render_scale
+        self.presenter = Presenter(WORLD_SIZE, render_scale)
+        self.screen = self.presenter.open() # (640, 480), (960, 720), (768, 576)
+        self.display = self.presenter.make_display()
+
+        # what changed on the display each frame, None draws and updates the whole screen every frame
+        self.dirty = DirtyRects(self.display.get_size()) if dirty_rects else None
 
-        self.display2 = pygame.Surface(x)
+        # named timings around every phase of the frame, costs next to nothing while disabled
+        self.profiler = Profiler(enabled=profile or telemetry is not None)
+        self.telemetry = Telemetry(telemetry, trace_memory=trace_memory) if telemetry is not None else None
+
+        # (image, position) of every sprite drawn this frame, dirty rects redraws where they went
+        self.sprites = []
 
 
         self.clock = pygame.time.Clock()
         
         self.movement = [False, False, False, False]
 
-        self.assets = {
-            'background': load_image('black.jpg'),
-            'boss/idle': Animation(load_images('entities/boss/idle')),
-            'enemy/idle': Animation(load_images('entities/enemy/idle')),
-            'player/idle': Animation(load_images('entities/player/idle')),
-            'particle/particle': Animation(load_images('particles/particle'), img_dur=6, loop=False),
-        }
+        # rotated sprite stacks, enemies all share self.enemyRotation so one cached stack serves all of them
+        self.rotation_cache = RotationCache(angle_step=1)
+
+        # images come out of atlases cached on disk, the idle frames are loaded once and shared by the animations and stacks
+        # everything gets read on a thread pool while the loading screen is up
+        self.loader = AssetManager()
+        self.loader.preload(['black.jpg', 'entities/enemy/idle', 'entities/player/idle', 'particles/particle'])
+        # adding sound, silent when there's no audio or a file is missing
+        # a burst of hits in one frame plays once, the limits keep collisions from eating every channel
+        self.audio = AudioManager(self.loader, channels=16, enabled=not headless)
+        self.audio.add('jump', 'data/sfx/jump.wav')
+        self.audio.add('dash', 'data/sfx/dash.wav', volume=0.3)
+        self.audio.add('hit', 'data/sfx/hit.wav', volume=0.8, max_voices=3, min_interval=0.08)
+        self.audio.add('shoot', 'data/sfx/shoot.wav', volume=0.4, max_voices=4, min_interval=0.03)
+        self.audio.add('ambience', 'data/sfx/ambience.wav', volume=0.2, max_voices=1, preload=False) # long loop, loaded when it first plays
+        self.audio.preload()
+        self.loading_screen()
+        self.loader.preload(['entities/boss/idle']) # not needed until the first boss, keeps loading in the background (see load_boss)
 
-        # adding sound
-        self.sfx = {
-            'jump': pygame.mixer.Sound('data/sfx/jump.wav'),
-            'dash': pygame.mixer.Sound('data/sfx/dash.wav'),
-            'hit': pygame.mixer.Sound('data/sfx/hit.wav'),
-            'shoot': pygame.mixer.Sound('data/sfx/shoot.wav'),
-            'ambience': pygame.mixer.Sound('data/sfx/ambience.wav'),
+        self.assets = {
+            'background': self.loader.image('black.jpg'),
+            'enemy/idle': Animation(self.loader.images('entities/enemy/idle')),
+            'player/idle': Animation(self.loader.images('entities/player/idle')),
+            'particle/particle': Animation(self.loader.images('particles/particle'), img_dur=6, loop=False),
+            'player/stack': SpriteStack(self.loader.images('entities/player/idle'), spread=1.1, rotations=self.rotation_cache, scale=render_scale),
+            'enemy/stack': SpriteStack(self.loader.images('entities/enemy/idle'), rotations=self.rotation_cache, scale=render_scale),
         }
 
-        self.playerImg = load_images('entities/player/idle')
-        self.enemyImg = load_images('entities/enemy/idle') # just make shooting particle effects
-        self.bossImg = load_images('entities/boss/idle')
-        
-        self.sfx['ambience'].set_volume(0.2)
-        self.sfx['shoot'].set_volume(0.4)
-        self.sfx['hit'].set_volume(0.8)
-        self.sfx['dash'].set_volume(0.3)
+        self.playerImg = self.assets['player/stack']
+        self.enemyImg = self.assets['enemy/stack'] # just make shooting particle effects
+        self.bossImg = None # see load_boss
 
         #self.clouds = Clouds(self.assets['clouds'], count=16)
 
+        # broad phase for entity collisions, entities register themselves as they move
+        self.grid = SpatialHash(cell_size=64)
+
         # initalizing player
-        self.player = Player(self, (self.display2.get_width()/2, self.display2.get_height()/2), (32, 32))
+        self.player = Player(self, (WORLD_SIZE[0]/2, WORLD_SIZE[1]/2), (32, 32))
 
         # initalizing tilemap
-        self.tilemap = Tilemap(self, tile_size=16)
+        self.tilemap = Tilemap(self, tile_size=16, render_scale=render_scale)
 
-        self.sparks = []
+        # fixed size pools, the oldest get recycled when they're full
+        self.sparks = SparkSystem(capacity=4096, scale=render_scale)
+        self.particles = ParticleSystem(self.assets['particle/particle'], capacity=2048, scale=render_scale)
+        # updates, draws and expires them, and caps how many get spawned each frame
+        self.effects = Effects(self.particles, self.sparks, spawn_budget=128)
         self.projectiles = []
 
         # tracking level
@@ -77,6 +125,7 @@ class Game:
 
         # screen shake
         self.screenshake = 0
+        self.shake_random = random.Random()
 
         self.cooldown = 0
         self.angle_count = 0
@@ -88,6 +137,11 @@ class Game:
         self.gameOver = 0
         self.enemies = [] 
         self.bosses = []
+        self.max_enemies = 50 # raise for stress runs
+
+        self.pool = None
+        if entity_pool:
+            self.pool = EntityPool(self)
         self.spawn_timer = 0
         self.spawn_interval = 10
 
@@ -96,44 +150,114 @@ class Game:
         self.counter = 0
         self.start = 0
 
+        # HUD text, made once and updated instead of being rebuilt every frame
+        offsetText = 3
+        self.score_text = Text("Score: 0", pos=(WORLD_SIZE[0] // 2 -30, 13))
+        self.replay_text = Text("Press L to Restart", pos=(WORLD_SIZE[0] /2 - 120, WORLD_SIZE[1] // 2 - 13))
+        self.replay_text2 = Text("Press L to Restart", pos=(WORLD_SIZE[0] /2 - 120 + offsetText, WORLD_SIZE[1] // 2 - 13 + offsetText))
+
         self.load_level(0)  # self.load_level(self.level), hard coding to 1 atm
+
+        # everything random in the simulation comes from random, seeding it plus the inputs make a run repeatable
+        self.ticks = 0 # steps so far, recorded inputs are stamped with it
+        if record is not None and seed is None:
+            seed = random.randrange(2 ** 32)
+        if seed is not None:
+            random.seed(seed)
+            self.shake_random.seed(seed)
+        self.recorder = InputRecorder(record, seed) if record is not None else None
         
         
     def spawn_enemy(self):
         i = random.randint(0, 1)
         if i == 1:
-            x = random.randint(50, self.screen.get_width() - 50)
+            x = random.randint(50, WORLD_SIZE[0] - 50)
             y = 60
 
         if i == 0:
             x = 50
-            y = random.randint(60, self.screen.get_height() + 20)
+            y = random.randint(60, WORLD_SIZE[1] + 20)
+
+        if self.pool is not None:
+            self.pool.spawn('enemy', [x, y], [16, 16])
+            return
 
-        self.enemies.append(Enemies(self, [x, y], [16, 16]))
+        enemy = Enemies(self, [x, y], [16, 16])
+        self.grid.update(enemy, enemy.rect())
+        self.enemies.append(enemy)
 
             
+    def loading_screen(self):
+        '''
+        shows a progress bar until everything that was preloaded is finished, nothing to show when headless
+        '''
+        if self.headless:
+            self.loader.wait()
+            return
+        while self.loader.pending:
+            progress = self.loader.poll()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+            bar = pygame.Rect(0, 0, self.screen.get_width() // 2, 12)
+            bar.center = (self.screen.get_width() // 2, self.screen.get_height() // 2)
+            self.screen.fill((0, 0, 0))
+            pygame.draw.rect(self.screen, (255, 255, 255), (bar.x, bar.y, bar.width * progress, bar.height))
+            pygame.draw.rect(self.screen, (255, 255, 255), bar, 1)
+            pygame.display.update()
+            self.clock.tick(60)
+
+    def load_boss(self):
+        '''
+        loads the boss frames the first time a boss spawns, they've usually finished loading in the background by then
+        '''
+        if self.bossImg is None:
+            frames = self.loader.images('entities/boss/idle')
+            self.assets['boss/idle'] = Animation(frames)
+            self.assets['boss/stack'] = self.bossImg = SpriteStack(frames, rotations=self.rotation_cache, scale=self.render_scale)
+
+    def projectile_imgs(self):
+        '''
+        the projectile image facing right and a copy facing left, flipped once the first time it's needed
+        instead of a new flipped copy for every projectile every frame
+        () -> ((right image, left image))
+        '''
+        if 'projectile/flipped' not in self.assets:
+            self.assets['projectile/right'] = scale_image(self.assets['projectile'], self.render_scale) # scaled once too
+            self.assets['projectile/flipped'] = pygame.transform.flip(self.assets['projectile/right'], True, False)
+        return self.assets['projectile/right'], self.assets['projectile/flipped']
+
     def spawn_boss(self):
         i = random.randint(0, 8)
         if i == 1:
-            x = random.randint(50, self.screen.get_width() - 50)
+            x = random.randint(50, WORLD_SIZE[0] - 50)
             y = 60
-            self.bosses.append(Boss(self, [x, y], [16, 16]))
         elif i == 0:
             x = 50
-            y = random.randint(60, self.screen.get_height() + 20)
-            self.bosses.append(Boss(self, [x, y], [16, 16]))
-        
+            y = random.randint(60, WORLD_SIZE[1] + 20)
         else:
-            pass
+            return
+        self.load_boss()
+
+        if self.pool is not None:
+            self.pool.spawn('boss', [x, y], [16, 16])
+            return
+
+        boss = Boss(self, [x, y], [16, 16])
+        self.grid.update(boss, boss.rect())
+        self.bosses.append(boss)
 
         
 
     def load_level(self, map_id):
-        self.tilemap.load('data/maps/' + str(map_id) + '.json')
+        path = 'data/maps/' + str(map_id)
+        # a binary copy of the map (made with convert_map.py) loads a lot faster, use it if there is one
+        self.tilemap.load(path + BINARY_EXTENSION if os.path.exists(path + BINARY_EXTENSION) else path + '.json')
         self.gameOver = 0
 
         # keep track
-        self.particles = []
+        self.effects.clear()
 
         # creating 'camera' 
         self.scroll = [0, 0]
@@ -156,6 +280,9 @@ class Game:
         # spawn the ememies
         self.enemies = [] # clear enemies
         self.bosses = []
+        self.grid.clear()
+        if self.pool is not None:
+            self.pool.clear()
 
         for spawner in self.tilemap.extract([('spawners', 0)]):
             if spawner['variant'] == 0: 
@@ -165,53 +292,87 @@ class Game:
                 self.movement = [False, False, False, False]
                 self.left_key_pressed = False
                 self.right_key_pressed = False
+        self.grid.update(self.player, self.player.rect())
 
 
-    def run(self):
+    def handle_event(self, event):
         '''
-        runs the Game
+        reacts to one pygame event, used by the live loop and by anything feeding events in (headless runs)
+        (event)
+        '''
+        if self.recorder is not None:
+            self.recorder.record(self.ticks, event)
+        if event.type == pygame.QUIT: # have to code the window closing
+            self.close()
+            pygame.quit()
+            sys.exit()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3: # performance overlay
+            self.profiler.toggle()
+        if self.gameOver:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_l:
+                self.load_level(self.level)
+        else: 
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_a: # referencing WASD
+                    self.left_key_pressed = True
+                    self.start = 1
+                if event.key == pygame.K_d:
+                    self.right_key_pressed = True
+                    self.start = 1
+            elif event.type == pygame.KEYUP:
+                if event.key == pygame.K_a:
+                    self.left_key_pressed = False
+                elif event.key == pygame.K_d:
+                    self.right_key_pressed = False
+
+    def step(self):
+        '''
+        advances the simulation one tick: input rotation, spawning, entity updates, collisions, scoring and effects
+        doesn't draw anything, so it can run without a window
         '''
+        with self.profiler.scope('input'):
+            if self.left_key_pressed:
+                self.rotations = (self.rotations + 1.6 ) % 360
+            if self.right_key_pressed:
+                self.rotations = (self.rotations - 1.6 ) % 360
 
-        #pygame.mixer.music.load('data/music.mp3')
-        #pygame.mixer.music.set_volume(0.5)
-        #pygame.mixer.music.play(-1)
+            #self.movement[2] = True
+            if self.rotations > 90 and self.rotations < 180:
+                self.movement[0] = True
+                self.movement[3] = True
+                self.movement[1] = False
+                self.movement[2] = False
+            if self.rotations < 90 and self.rotations > 0:
+                self.movement[0] = True
+                self.movement[2] = True
+                self.movement[3] = False
+                self.movement[1] = False
+            if self.rotations > 180 and self.rotations < 270:
+                self.movement[1] = True 
+                self.movement[3] = True
+                self.movement[0] = False
+                self.movement[2] = False
+            if self.rotations > 270: # last case as to not activate unless actually in state
+                self.movement[1] = True
+                self.movement[2] = True
+                self.movement[0] = False
+                self.movement[3] = False
 
-        #self.sfx['ambience'].play(-1)
+        self.screenshake = max(0, self.screenshake-1) # resets screenshake value
 
-        # creating an infinite game loop
-        while True:
-            self.display.fill((0, 0, 0, 0))    # black outlines
-            self.display.fill((0,0,0,0))
-            # clear the screen for new image generation in loop
-            self.screen.blit(self.assets['background'], (0,0)) # no outline
-
-
-            self.screenshake = max(0, self.screenshake-1) # resets screenshake value
-
-            if self.dead: 
-                self.dead += 1
-                if self.dead >= 10: # to make the level transitions smoother
-                    self.transition = min(self.transition + 1, 20) # go as high as it can without changing level
-                if self.dead > 30: # timer that starts when you die
-                    # self.level = 0
-                    offsetText = 3
-                    replay = Text("Press L to Restart", pos=(self.display.get_width() /2 - 120, self.display.get_height() // 2 - 13))
-                    replay.render(self.display, 40)
-                    replay2 = Text("Press L to Restart", pos=(self.display.get_width() /2 - 120 + offsetText, self.display.get_height() // 2 - 13 + offsetText))
-                    replay2.render(self.display, 40, color=(255,255,255))
-                    self.movement = [False, False, False, False]
-                    self.gameOver = 1
-
-            # scroll = current scroll + (where we want the camera to be - what we have/can see currently) 
-            self.scroll[0] = self.display.get_width()/ 2 / 30 
-            self.scroll[1] = self.display.get_height()/ 2 / 30
-            # fix the jitter
-            render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
-
-            self.tilemap.render(self.display, offset=render_scroll)
+        if self.dead: 
+            self.dead += 1
+            if self.dead >= 10: # to make the level transitions smoother
+                self.transition = min(self.transition + 1, 20) # go as high as it can without changing level
+            if self.dead > 30: # timer that starts when you die
+                # self.level = 0
+                self.movement = [False, False, False, False]
+                self.gameOver = 1
 
+        with self.profiler.scope('spawn'):
             # spawn enemies
-            if self.start and len(self.enemies) < 50:
+            enemy_count = self.pool.alive_count('enemy') if self.pool is not None else len(self.enemies)
+            if self.start and enemy_count < self.max_enemies:
                 self.spawn_timer += random.random() * self.score
                 if self.spawn_timer >= self.spawn_interval and not self.dead:
                     self.spawn_enemy()
@@ -221,187 +382,287 @@ class Game:
                         self.spawn_boss()
 
 
-            self.enemyRotation = (self.enemyRotation + 1) % 360
+        self.enemyRotation = (self.enemyRotation + 1) % 360
 
 
-            trueWidth =  self.screen.get_width() + 30
-            trueHeight = self.screen.get_height() + 20
+        trueWidth =  WORLD_SIZE[0] + 30
+        trueHeight = WORLD_SIZE[1] + 20
 
-            # render the enemies
-            for enemy in self.enemies.copy():
+        with self.profiler.scope('enemies'):
+            # update the whole pool at once
+            if self.pool is not None:
+                for center in self.pool.update(self.player.rect(), (trueWidth, trueHeight)):
+                    death_burst(self, center)
+                    self.dead += 1 # die
+
+            # update the enemies
+            alive = []
+            for enemy in self.enemies:
                 kill =  enemy.update(self.tilemap, (1,1))
-                enemy.render(self.display, self.enemyImg, self.enemyRotation, offset=render_scroll)
-                #pygame.draw.rect(self.display, (255, 0, 0), (enemy.pos[0] - render_scroll[0] - 30, enemy.pos[1] - render_scroll[1] - 40, enemy.size[0], enemy.size[1]), 3)
-                if kill: # if enemies update fn returns true [**]d
-                    self.enemies.remove(enemy) 
-                if enemy.pos[1] >= trueHeight:
-                    self.enemies.remove(enemy) 
-                if enemy.pos[0] < 50:
-                     self.enemies.remove(enemy)
-                if enemy.pos[1] < 60:
-                     self.enemies.remove(enemy) 
-                if enemy.pos[0] > trueWidth:
-                    self.enemies.remove(enemy) 
-                if self.player.rect().colliderect(enemy): # player collides with enemy
+                if kill: # if enemies update fn returns true [**]d, they only die by running into the player
                     self.dead += 1 # die
-            
-            for enemy in self.bosses.copy():
+                if kill or enemy.pos[1] >= trueHeight or enemy.pos[0] < 50 or enemy.pos[1] < 60 or enemy.pos[0] > trueWidth:
+                    self.grid.remove(enemy)
+                else:
+                    alive.append(enemy)
+            self.enemies = alive
+        
+            alive = []
+            for enemy in self.bosses:
                 kill =  enemy.update(self.tilemap, (3,3))
-                enemy.render(self.display, self.bossImg, 240, offset=render_scroll)
-                #pygame.draw.rect(self.display, (255, 0, 0), (enemy.pos[0] - render_scroll[0] - 30, enemy.pos[1] - render_scroll[1] - 40, enemy.size[0], enemy.size[1]), 3)
-                if kill: # if enemies update fn returns true [**]d
-                    self.bosses.remove(enemy) 
-                if enemy.pos[1] >= trueHeight:
-                    self.bosses.remove(enemy) 
-                if enemy.pos[0] < 50:
-                     self.bosses.remove(enemy)
-                if enemy.pos[1] < 60:
-                     self.bosses.remove(enemy) 
-                if enemy.pos[0] > trueWidth:
-                    self.bosses.remove(enemy) 
-                if self.player.rect().colliderect(enemy): # player collides with enemy
+                if kill: # if enemies update fn returns true [**]d, they only die by running into the player
                     self.dead += 1 # die
-            
+                if kill or enemy.pos[1] >= trueHeight or enemy.pos[0] < 50 or enemy.pos[1] < 60 or enemy.pos[0] > trueWidth:
+                    self.grid.remove(enemy)
+                else:
+                    alive.append(enemy)
+            self.bosses = alive
+        
 
+        with self.profiler.scope('player'):
             if self.dead:
-                # self.sfx['hit'].play()
+                # self.audio.play('hit')
                 self.cooldown = 150
                 self.screenshake = max(16, self.screenshake)  # apply screenshake, larger wont be overrided by a smaller screenshake
-                for i in range(30): # when projectile hits player
-                    # on death sparks
-                    angle = random.random() * math.pi * 2 # random angle in a circle
-                    speed = random.random() * 5
-                    self.sparks.append(Spark(self.player.rect().center, angle, 2 + random.random()))    # fix sparks
-                    # on death particles
-                    self.particles.append(Particle(self, 'particle', self.player.rect().center, velocity=[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle * math.pi) * speed * 0.5], frame=random.randint(0, 7)))
-        
+                burst(self, self.player.rect().center) # on death sparks and particles
+    
 
             if not self.dead and self.start == 1:
                 # update player movement and score counter
                 self.counter += 1
                 self.score = self.counter // 60
                 self.player.update(self.tilemap, ((self.movement[1] - self.movement[0]) * self.player.speed, (self.movement[3] - self.movement[2]) * self.player.speed))
-            self.player.render(self.display,  self.playerImg, self.rotations, offset=render_scroll, spread=1.1)
-            #pygame.draw.rect(self.display, (255, 255, 0), (self.player.pos[0] - render_scroll[0] - 33, self.player.pos[1] - render_scroll[1] - 50, self.player.size[0], self.player.size[1]), 3)
 
-            for projectile in self.projectiles.copy():
+        with self.profiler.scope('projectiles'):
+            for projectile in self.projectiles:
                 projectile[0][0] += projectile[1] 
                 projectile[2] += 1
-                img = self.assets['projectile']
-                self.display.blit(img if projectile[1] > 0 else pygame.transform.flip(img, True, False), (projectile[0][0] - img.get_width() / 2 - render_scroll[0], projectile[0][1] - img.get_height() / 2 - render_scroll[1])) # spawns it the center of the projectile
-                
+            # every projectile checked against the solid tiles in one lookup
+            solid = self.tilemap.solid_check_many([projectile[0] for projectile in self.projectiles]) if self.projectiles else []
+
+            for projectile, hit_wall in zip(self.projectiles.copy(), solid):
                 # keep this but change it to the borders of the map, also might want some obsticles later
-                if self.tilemap.solid_check(projectile[0]): # if location is a solid tile
+                if hit_wall: # if location is a solid tile
                     self.projectiles.remove(projectile)
-                    for i in range(4):
-                        self.sparks.append(Spark(projectile[0], random.random() - 0.5 + (math.pi if projectile[1] > 0 else 0), 2 + random.random())) # (math.pi if projectile[1] > 0 else 0), sparks bounce in oppositie direction if hit wall which depends on projectile direction
+                    rolls = [(random.random() - 0.5 + (math.pi if projectile[1] > 0 else 0), 2 + random.random()) for i in range(4)] # (math.pi if projectile[1] > 0 else 0), sparks bounce in oppositie direction if hit wall which depends on projectile direction
+                    self.effects.spawn_sparks(projectile[0], [roll[0] for roll in rolls], [roll[1] for roll in rolls])
                 elif projectile[2] > 360: #if timer > 6 seconds
                     self.projectiles.remove(projectile)
-                    if self.player.rect().collidepoint(projectile[0]):
+                    if self.player in self.grid.query_point(projectile[0]):
                         self.projectiles.remove(projectile)
                         self.dead += 1
-                        self.sfx['hit'].play()
+                        self.audio.play('hit')
                         self.screenshake = max(16, self.screenshake)  # apply screenshake, larger wont be overrided by a smaller screenshake
-                        for i in range(30): # when projectile hits player
-                            # on death sparks
-                            angle = random.random() * math.pi * 2 # random angle in a circle
-                            speed = random.random() * 5
-                            self.sparks.append(Spark(self.player.rect().center, angle, 2 + random.random())) 
-                            # on death particles
-                            self.particles.append(Particle(self, 'particle', self.player.rect().center, velocity=[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle * math.pi) * speed * 0.5], frame=random.randint(0, 7)))
-           
-                                    
-            #hp_1 = Heart(self.assets['heart'].copy(), [13, 19], 15)
-            #hp_2 = Heart(self.assets['heart'].copy(), [30, 19], 15)
-            #hp_3 = Heart(self.assets['heart'].copy(), [47, 19], 15)
-            #if self.dead <= 0 and self.dead < 1:
-            #    hp_1.update()
-            #    hp_1.render(self.display_black)
-            #if self.dead <= -1:
-            #    hp_2.update()
-            #    hp_2.render(self.display_black)
-            #if self.dead <= -2:
-            #    hp_3.update()
-            #    hp_3.render(self.display_black)
-            
-            level_bar = Text("Score: " + str(self.score), pos=(self.display.get_width() // 2 -30, 13))
-            level_bar.render(self.display, 22)
-            
+                        burst(self, self.player.rect().center) # when projectile hits player
 
-            # black ouline based on display_black
-            display_mask = pygame.mask.from_surface(self.display)
-            display_sillhouette = display_mask.to_surface(setcolor=(0, 0, 0, 180), unsetcolor=(0, 0, 0, 0)) # 180 opaque, 0 transparent
-            self.display2.blit(display_sillhouette, (0, 0))
-            for offset in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                self.display2.blit(display_sillhouette, offset) # putting what we drew onframe back into display
+        # every particle and spark moves and expires in one go
+        with self.profiler.scope('effects'):
+            self.effects.update()
 
+        self.ticks += 1
 
-            for particle in self.particles.copy():
-                kill = particle.update()
-                particle.render(self.display, offset=render_scroll)
-                if particle.type == 'leaf':
-                    particle.pos[0] += math.sin(particle.animation.frame * 0.035) * 0.3 # making the parlitcle move back and forth smooth'y
-                if kill:
-                    self.particles.remove(particle)
+    def render(self):
+        '''
+        draws the current state of the game onto the display
+        '''
+        with self.profiler.scope('clear'):
+            if self.dirty is not None:
+                self.dirty.clear(self.display) # only erase what got drawn last frame, the background goes on in present
+            else:
+                self.display.fill((0, 0, 0, 0)) # clear for new image generation in loop, the background goes on in present
+
+        if self.gameOver:
+            self.replay_text.render(self.display, 40, sprites=self.sprites, scale=self.render_scale)
+            self.replay_text2.render(self.display, 40, color=(255,255,255), sprites=self.sprites, scale=self.render_scale)
+
+        # scroll = current scroll + (where we want the camera to be - what we have/can see currently) 
+        self.scroll[0] = WORLD_SIZE[0]/ 2 / 30 
+        self.scroll[1] = WORLD_SIZE[1]/ 2 / 30
+        # fix the jitter
+        render_scroll = (int(self.scroll[0]), int(self.scroll[1]))
+
+        with self.profiler.scope('tiles'):
+            self.tilemap.render(self.display, offset=render_scroll, sprites=self.sprites)
+
+        with self.profiler.scope('entities'):
+            # render the whole pool at once
+            if self.pool is not None:
+                stacks = {'enemy': (self.enemyImg, self.enemyRotation)}
+                if self.bossImg is not None:
+                    stacks['boss'] = (self.bossImg, 240)
+                self.pool.render(self.display, stacks, offset=render_scroll)
 
+            # render the enemies
+            for enemy in self.enemies:
+                enemy.render(self.display, self.enemyImg, self.enemyRotation, offset=render_scroll)
+                #pygame.draw.rect(self.display, (255, 0, 0), (enemy.pos[0] - render_scroll[0] - 30, enemy.pos[1] - render_scroll[1] - 40, enemy.size[0], enemy.size[1]), 3)
+            for enemy in self.bosses:
+                enemy.render(self.display, self.bossImg, 240, offset=render_scroll)
+                #pygame.draw.rect(self.display, (255, 0, 0), (enemy.pos[0] - render_scroll[0] - 30, enemy.pos[1] - render_scroll[1] - 40, enemy.size[0], enemy.size[1]), 3)
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT: # have to code the window closing
-                    pygame.quit()
-                    sys.exit()
-                if self.gameOver:
-                    if event.type == pygame.KEYDOWN and event.key == pygame.K_l:
-                        self.load_level(self.level)
-                else: 
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_a: # referencing WASD
-                            self.left_key_pressed = True
-                            self.start = 1
-                        if event.key == pygame.K_d:
-                            self.right_key_pressed = True
-                            self.start = 1
-                    elif event.type == pygame.KEYUP:
-                        if event.key == pygame.K_a:
-                            self.left_key_pressed = False
-                        elif event.key == pygame.K_d:
-                            self.right_key_pressed = False
+            self.player.render(self.display,  self.playerImg, self.rotations, offset=render_scroll, spread=1.1)
+            #pygame.draw.rect(self.display, (255, 255, 0), (self.player.pos[0] - render_scroll[0] - 33, self.player.pos[1] - render_scroll[1] - 50, self.player.size[0], self.player.size[1]), 3)
 
-            if self.left_key_pressed:
-                self.rotations = (self.rotations + 1.6 ) % 360
-            if self.right_key_pressed:
-                self.rotations = (self.rotations - 1.6 ) % 360
+            right, left = self.projectile_imgs() if self.projectiles else (None, None)
+            for projectile in self.projectiles:
+                img = right if projectile[1] > 0 else left
+                img_pos = ((projectile[0][0] - render_scroll[0]) * self.render_scale - img.get_width() / 2, (projectile[0][1] - render_scroll[1]) * self.render_scale - img.get_height() / 2)
+                self.display.blit(img, img_pos) # spawns it the center of the projectile
+                self.sprites.append((img, img_pos))
+                                
+        #hp_1 = Heart(self.assets['heart'].copy(), [13, 19], 15)
+        #hp_2 = Heart(self.assets['heart'].copy(), [30, 19], 15)
+        #hp_3 = Heart(self.assets['heart'].copy(), [47, 19], 15)
+        #if self.dead <= 0 and self.dead < 1:
+        #    hp_1.update()
+        #    hp_1.render(self.display_black)
+        #if self.dead <= -1:
+        #    hp_2.update()
+        #    hp_2.render(self.display_black)
+        #if self.dead <= -2:
+        #    hp_3.update()
+        #    hp_3.render(self.display_black)
+        
+        with self.profiler.scope('hud'):
+            self.score_text.level = "Score: " + str(self.score) # cached text, only re-rendered when the score changes
+            self.score_text.render(self.display, 22, sprites=self.sprites, scale=self.render_scale)
+        
 
-            #self.movement[2] = True
-            if self.rotations > 90 and self.rotations < 180:
-                self.movement[0] = True
-                self.movement[3] = True
-                self.movement[1] = False
-                self.movement[2] = False
-            if self.rotations < 90 and self.rotations > 0:
-                self.movement[0] = True
-                self.movement[2] = True
-                self.movement[3] = False
-                self.movement[1] = False
-            if self.rotations > 180 and self.rotations < 270:
-                self.movement[1] = True 
-                self.movement[3] = True
-                self.movement[0] = False
-                self.movement[2] = False
-            if self.rotations > 270: # last case as to not activate unless actually in state
-                self.movement[1] = True
-                self.movement[2] = True
-                self.movement[0] = False
-                self.movement[3] = False
+        if self.dirty is not None:
+            self.dirty.add_sprites(self.sprites)
+        self.sprites.clear()
 
+        with self.profiler.scope('draw_effects'):
+            # every particle and spark draws in one go
+            effect_rects = self.effects.render(self.display, offset=render_scroll, dirty=self.dirty is not None)
+            if self.dirty is not None:
+                self.dirty.add_rects(effect_rects)
 
-            self.display2.blit(self.display, (0, 0)) # black 
+        if self.profiler.enabled:
+            self.profile_counts()
+        overlay_rect = self.profiler.render(self.display)
+        if overlay_rect is not None and self.dirty is not None:
+            self.dirty.add(overlay_rect)
 
+    def counts(self):
+        '''
+        how many of everything there is right now
+        () -> ({'enemies': int, 'bosses': int, 'projectiles': int, 'particles': int, 'sparks': int, 'dropped': int})
+        '''
+        counts = {
+            'enemies': self.pool.alive_count('enemy') if self.pool is not None else len(self.enemies),
+            'bosses': self.pool.alive_count('boss') if self.pool is not None else len(self.bosses),
+            'projectiles': len(self.projectiles),
+        }
+        counts.update(self.effects.counts())
+        return counts
 
-            screenshake_offset = (random.random() * self.screenshake - self.screenshake / 2, random.random() * self.screenshake - self.screenshake / 2)
-            self.screen.blit(pygame.transform.scale(self.display, self.screen.get_size()), screenshake_offset) # render (now scaled) display image on big screen
-            
-            pygame.display.update()
-            self.clock.tick(60) # run at 60 fps, like a sleep
+    def profile_counts(self):
+        '''
+        live counts for the profiler overlay
+        '''
+        for name, value in self.counts().items():
+            self.profiler.count(name, value)
+        self.profiler.count('fps', round(self.clock.get_fps()))
+
+    def record_telemetry(self):
+        '''
+        adds this frame's timings and counts to the telemetry file, if there is one
+        '''
+        if self.telemetry is None:
+            return
+        times = {name: self.profiler.last(name) for name in ['step', 'render', 'present']}
+        times['busy'] = self.profiler.last('frame')
+        self.telemetry.record(times, self.counts())
+
+    def present(self):
+        '''
+        puts the display on the window, shaken if there's screenshake
+        '''
+        # own rng so the screenshake doesn't change the simulation's random numbers (headless runs skip this)
+        screenshake_offset = (self.shake_random.random() * self.screenshake - self.screenshake / 2, self.shake_random.random() * self.screenshake - self.screenshake / 2)
+        if self.dirty is not None:
+            return self.present_dirty(screenshake_offset)
+        self.presenter.present(self.display, self.assets['background'], screenshake_offset)
+
+    def present_dirty(self, screenshake_offset):
+        '''
+        present for dirty rects, redraws the background and display only where something changed
+        (screenshake offset)
+        '''
+        rects = self.dirty.frame()
+        if self.screenshake:
+            rects = None # everything moves
+            self.dirty.invalidate() # and has to move back next frame
+        if rects is None:
+            self.presenter.present(self.display, self.assets['background'], screenshake_offset)
+        else:
+            self.presenter.present_rects(self.display, self.assets['background'], rects)
+
+    def close(self):
+        '''
+        finishes the telemetry and input recording files, safe to call more than once
+        '''
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.recorder is not None:
+            self.recorder.close(self.ticks)
+
+    def frame(self, events, render=True):
+        '''
+        one frame of the game: handles the events, steps, draws and presents, shared by the live loop and replays
+        (pygame events, draw and present: bool)
+        '''
+        with self.profiler.scope('frame'): # everything but the wait for the next frame
+            with self.profiler.scope('events'):
+                for event in events:
+                    self.handle_event(event)
+
+            with self.profiler.scope('step'):
+                self.step()
+            if render:
+                with self.profiler.scope('render'):
+                    self.render()
+                with self.profiler.scope('present'):
+                    self.present()
+        self.record_telemetry()
+
+    def run(self):
+        '''
+        runs the Game
+        '''
+
+        #self.audio.play_music('data/music.mp3', volume=0.5) # streamed, not loaded into memory
+
+        #self.audio.play('ambience', loops=-1)
+
+        # creating an infinite game loop
+        try:
+            while True:
+                self.frame(pygame.event.get())
+                self.clock.tick(60) # run at 60 fps, like a sleep
+        finally:
+            self.close() # crashes and ctrl+c still write out the buffered telemetry and the recording
+
+def seed_arg(text):
+    '''
+    argparse type for --seed, only takes seeds a replay can store
+    (text) -> (int)
+    '''
+    seed = int(text)
+    if seed not in REPLAY_SEEDS:
+        raise argparse.ArgumentTypeError(f'seed has to be from 0 to 2**64 - 1, not {seed}')
+    return seed
 
 # returns the game then runs it
-Game().run()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='play the game')
+    parser.add_argument('--dirty-rects', action='store_true', help='only redraw what changed each frame')
+    parser.add_argument('--render-scale', type=float, default=1, help='draw at this fraction of the window resolution and scale up (0.5 = 570x405)')
+    parser.add_argument('--profile', action='store_true', help='profile every phase from the start (F3 shows the overlay)')
+    parser.add_argument('--telemetry', help='.csv or .jsonl file to record frame times, counts and memory to')
+    parser.add_argument('--trace-memory', action='store_true', help='also record python allocations with tracemalloc (slow)')
+    parser.add_argument('--seed', type=seed_arg, help='seed for random, same seed and inputs play out the same')
+    parser.add_argument('--record', help='record the seed and key presses to this file (.replay gets added), play it back with play_replay.py')
+    args = parser.parse_args()
+    Game(dirty_rects=args.dirty_rects, render_scale=args.render_scale, profile=args.profile, telemetry=args.telemetry, trace_memory=args.trace_memory, seed=args.seed, record=args.record).run()
@@ -0,0 +1,54 @@
+import sys
+import time
+import random
+import argparse
+
+from game import Game
+
+def run_headless(ticks, seed=0, render=False, entity_pool=False, max_enemies=50):
+    '''
+    runs the simulation for a number of ticks as fast as it can, no window, no audio, no frame cap
+    the player starts right away and stands still, the level restarts whenever it's game over
+    (ticks, rng seed, also draw every tick: bool, use the entity pool: bool, enemy cap) -> (dict of results)
+    '''
+    random.seed(seed)
+    game = Game(entity_pool=entity_pool, headless=True)
+    game.max_enemies = max_enemies
+    game.start = 1 # same as pressing a key, without rotating the player
+    restarts = 0
+
+    start = time.perf_counter()
+    for tick in range(ticks):
+        if game.gameOver:
+            game.load_level(game.level)
+            game.start = 1
+            restarts += 1
+        game.step()
+        if render:
+            game.render()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'ticks': ticks,
+        'seconds': elapsed,
+        'ticks_per_second': ticks / elapsed if elapsed else float('inf'),
+        'restarts': restarts,
+        'score': game.score,
+        'enemies': game.pool.alive_count('enemy') if game.pool is not None else len(game.enemies),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='run the game headless and report simulation speed')
+    parser.add_argument('--ticks', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--render', action='store_true', help='also draw every tick (offscreen)')
+    parser.add_argument('--pool', action='store_true', help='keep enemies in the numpy entity pool')
+    parser.add_argument('--max-enemies', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    results = run_headless(args.ticks, seed=args.seed, render=args.render, entity_pool=args.pool, max_enemies=args.max_enemies)
+    print(f"{results['ticks']} ticks in {results['seconds']:.3f}s, {results['ticks_per_second']:.1f} ticks/s "
+          f"(score {results['score']}, enemies {results['enemies']}, restarts {results['restarts']})")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,32 @@
+import sys
+import json
+import time
+import argparse
+
+from scripts.replay import play_replay
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='play a recorded game back headless and unthrottled, and report where the frame time went')
+    parser.add_argument('path', help='file recorded with python game.py --record')
+    parser.add_argument('--no-render', action='store_true', help='only run the simulation, skip drawing and presenting')
+    parser.add_argument('--entity-pool', action='store_true')
+    parser.add_argument('--dirty-rects', action='store_true')
+    parser.add_argument('--render-scale', type=float, default=1)
+    parser.add_argument('--telemetry', help='.csv or .jsonl file to record every frame to')
+    parser.add_argument('--trace-memory', action='store_true', help='also record python allocations with tracemalloc (slow)')
+    parser.add_argument('--output', help='json file to write the per phase timings to, for comparing builds')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    game = play_replay(args.path, render=not args.no_render, entity_pool=args.entity_pool, dirty_rects=args.dirty_rects,
+                       render_scale=args.render_scale, profile=True, telemetry=args.telemetry, trace_memory=args.trace_memory)
+    elapsed = time.perf_counter() - start
+
+    print(f'{game.ticks} ticks in {elapsed:.2f}s, {elapsed / max(game.ticks, 1) * 1000:.3f} ms a tick, score {game.score}')
+    print('\n'.join(game.profiler.lines()))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'ticks': game.ticks, 'seconds': elapsed, 'score': game.score, 'phases': game.profiler.stats()}, f, indent=2)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,6 +1,34 @@
 import pygame
 import math
 
+from scripts.utils import LRUCache
+
+FONT_NAME = 'Superstar'
+
+fonts = {} # (name, size) -> font, SysFont scans the system fonts so only do it once per size
+text_cache = LRUCache(128) # (name, string, size, color, antialias) -> rendered text
+
+def get_font(name, size):
+    '''
+    returns the font for a name and size, loading it the first time
+    (font name, font size) -> (font)
+    '''
+    key = (name, size)
+    if key not in fonts:
+        fonts[key] = pygame.font.SysFont(name, size)
+    return fonts[key]
+
+def render_text(text, size, color, antialias=False, name=FONT_NAME):
+    '''
+    returns the rendered text, only rendering it again when something about it changes
+    (string, font size, color, antialias: bool, font name) -> (img)
+    '''
+    key = (name, text, size, tuple(color), antialias)
+    img = text_cache.get(key)
+    if img is None:
+        img = text_cache.put(key, get_font(name, size).render(text, antialias, color))
+    return img
+
 class Heart:
     def __init__(self, img, pos, speed):
         '''
@@ -39,11 +67,15 @@ class Text:
         self.pos = pos
     
 
-    def render(self, surf, fontsize, color=(255,255, 0)):
+    def render(self, surf, fontsize, color=(255,255, 0), sprites=None, antialias=False, scale=1):
         '''
-        renders img on screen
-        (surface, font size)
+        renders img on screen, the text is cached so it only gets rendered again when it changes
+        (surface, font size, color, list to add the drawn (image, position) to, antialias: bool,
+         render scale, the font size and position get scaled so the text is rendered at the size it's shown at)
         '''
         self.fontsize = fontsize
-        current_level = pygame.font.SysFont('Superstar', fontsize).render(f"{self.level}", False, color)
-        surf.blit(current_level, self.pos)
\ No newline at end of file
+        current_level = render_text(f"{self.level}", max(1, round(fontsize * scale)), color, antialias)
+        pos = self.pos if scale == 1 else (self.pos[0] * scale, self.pos[1] * scale)
+        surf.blit(current_level, pos)
+        if sprites is not None:
+            sprites.append((current_level, pos))
\ No newline at end of file
@@ -0,0 +1,250 @@
+import os
+import json
+import struct
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+import numpy as np
+
+from scripts.utils import BASE_IMG_PATH
+
+CACHE_PATH = '.cache/assets/'
+CACHE_VERSION = 1
+ATLAS_WIDTH = 1024 # images get packed into rows this wide, anything wider gets a row to itself
+
+class AssetManager:
+    def __init__(self, base_path=BASE_IMG_PATH, cache_path=CACHE_PATH, workers=4):
+        '''
+        loads images through texture atlases cached on disk, every image directory becomes one atlas
+        the first run decodes the pngs and writes the atlas, later runs read it back in one go as long as
+        none of the source files changed (name, size and modified time make up the cache key)
+        asking for the same path twice gives back the same surfaces
+        preload() reads and decodes on a thread pool, the main thread converts and packs them in poll()
+        (folder images are loaded from, folder the atlases are cached in, None to not cache, loader threads)
+        '''
+        self.base_path = base_path
+        self.cache_path = cache_path
+        self.workers = workers
+        self.executor = None # made the first time something gets preloaded
+        self.loaded = {} # path -> list of images, or the Sound for a sound
+        self.pending = {} # path -> future of whatever the worker read, waiting for the main thread
+        self.requested = 0 # how many preloads were asked for, for progress
+
+    def image(self, path):
+        '''
+        loads a single image, converted to the display's pixel format and cached
+        (file path) -> (img)
+        '''
+        return self.images(path)[0]
+
+    def images(self, path):
+        '''
+        loads every image in a directory, sorted by file name, out of one atlas
+        waits for it if it's still being preloaded
+        (directory path) -> (List of images within file)
+        '''
+        if path in self.pending:
+            self.finish(path)
+        if path not in self.loaded:
+            self.loaded[path] = self.build(self.atlas(path, self.read(path, self.masks())))
+        return self.loaded[path]
+
+    def sound(self, path, load_sound=pygame.mixer.Sound):
+        '''
+        loads a sound, waits for it if it's still being preloaded
+        (file path, what turns a path into a sound) -> (Sound)
+        '''
+        if path in self.pending:
+            self.finish(path)
+        if path not in self.loaded:
+            self.loaded[path] = load_sound(path)
+        return self.loaded[path]
+
+    def preload(self, paths):
+        '''
+        starts reading images (files or directories) on the thread pool, doesn't wait for them
+        (list of paths)
+        '''
+        masks = self.masks() # workers don't touch the display
+        for path in paths:
+            self.submit(path, self.read, path, masks)
+
+    def preload_sounds(self, paths, load_sound=pygame.mixer.Sound):
+        '''
+        starts loading sounds on the thread pool, doesn't wait for them
+        (list of file paths, what turns a path into a sound)
+        '''
+        for path in paths:
+            self.submit(path, load_sound, path)
+
+    def submit(self, path, fn, *args):
+        if path in self.loaded or path in self.pending:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='assets')
+        self.pending[path] = self.executor.submit(fn, *args)
+        self.requested += 1
+
+    def finish(self, path):
+        '''
+        waits for a preload and finishes it on this (the main) thread, errors from the worker come out here
+        (path)
+        '''
+        result = self.pending.pop(path).result()
+        self.loaded[path] = self.build(self.atlas(path, result)) if isinstance(result, tuple) else result # images come back from read() as a tuple
+
+    def poll(self):
+        '''
+        finishes every preload that's done without waiting on the rest, call it once a frame while loading
+        () -> (fraction of the preloads that are finished, 0 to 1)
+        '''
+        for path in [path for path, future in self.pending.items() if future.done()]:
+            self.finish(path)
+        return self.progress()
+
+    def progress(self):
+        '''
+        how far the preloads have got
+        () -> (fraction finished, 0 to 1)
+        '''
+        return 1 - len(self.pending) / self.requested if self.requested else 1
+
+    def wait(self):
+        '''
+        finishes every preload, waiting for the ones still going
+        '''
+        for path in list(self.pending):
+            self.finish(path)
+
+    def sources(self, path):
+        '''
+        the files a path stands for, a directory gives its images sorted by name
+        (file or directory path) -> (list of file paths)
+        '''
+        full = self.base_path + path
+        if os.path.isdir(full):
+            return [full + '/' + name for name in sorted(os.listdir(full)) if not name.startswith('.')] # skip .DS_Store and friends
+        return [full]
+
+    def key(self, files, masks):
+        '''
+        what the cached atlas has to match, changes whenever a source file is added, removed or edited
+        (list of file paths, pixel format masks) -> (dict)
+        '''
+        return {'version': CACHE_VERSION, 'masks': list(masks), 'files': [[os.path.basename(f), os.path.getsize(f), os.stat(f).st_mtime_ns] for f in files]}
+
+    def masks(self):
+        '''
+        the display's pixel format, everything gets converted to it
+        () -> (masks)
+        '''
+        return pygame.display.get_surface().get_masks()
+
+    def cache_file(self, path):
+        return self.cache_path + hashlib.sha1((self.base_path + path).encode('utf-8')).hexdigest()[:16] + '.atlas'
+
+    def read(self, path, masks):
+        '''
+        the file side of loading, safe to run on a worker: reads the cached atlas if it's still good, otherwise decodes the images
+        nothing gets converted here, atlas() does that on the main thread
+        (file or directory path, display's pixel format masks) -> ((cache key, (atlas info dict, pixels) or None, decoded images or None))
+        '''
+        files = self.sources(path)
+        key = self.key(files, masks)
+        if self.cache_path is not None:
+            cached = self.read_cache(self.cache_file(path), key)
+            if cached is not None:
+                return key, cached, None
+        return key, None, [pygame.image.load(f) for f in files]
+
+    def atlas(self, path, result):
+        '''
+        the main thread side: packs freshly decoded images into an atlas and caches it, a cached atlas is passed through
+        (path, what read() returned) -> ((atlas info dict, pixels))
+        '''
+        key, cached, imgs = result
+        if cached is not None:
+            return cached
+        info, pixels = self.pack(imgs, key['masks'])
+        info['key'] = key
+        if self.cache_path is not None:
+            self.write_cache(self.cache_file(path), info, pixels)
+        return info, pixels
+
+    def pack(self, imgs, masks):
+        '''
+        packs images into rows of one atlas, already in the display's pixel format
+        (list of images, pixel format masks) -> ((atlas info dict, raw pixels))
+        '''
+        rects = []
+        x = y = row_height = width = 0
+        for img in imgs:
+            w, h = img.get_size()
+            if x and x + w > ATLAS_WIDTH: # next row
+                x, y, row_height = 0, y + row_height, 0
+            rects.append([x, y, w, h])
+            x += w
+            row_height = max(row_height, h)
+            width = max(width, x)
+        atlas = pygame.Surface((max(width, 1), max(y + row_height, 1)), 0, 32, masks)
+        pixels = np.zeros((atlas.get_height(), atlas.get_width()), dtype=np.uint32)
+        colorkeys = []
+        for img, rect in zip(imgs, rects):
+            colorkey = img.get_colorkey()
+            colorkeys.append(list(colorkey) if colorkey else None)
+            # copy the exact pixel values convert() would give, a blit could blend alpha or drop the colorkey pixels
+            converted = img.convert(atlas)
+            pixels[rect[1]:rect[1] + rect[3], rect[0]:rect[0] + rect[2]] = np.frombuffer(converted.get_buffer().raw, dtype=np.uint32).reshape(rect[3], -1)[:, :rect[2]]
+        return {'size': list(atlas.get_size()), 'rects': rects, 'colorkeys': colorkeys}, pixels.tobytes()
+
+    def read_cache(self, cache_file, key):
+        '''
+        reads a cached atlas, None if there isn't one or it's out of date
+        (cache file path, key it has to match) -> ((atlas info dict, 32 bit pixels packed in the display's format))
+        '''
+        try:
+            f = open(cache_file, 'rb')
+        except OSError:
+            return None
+        with f:
+            data = f.read()
+        try:
+            length = struct.unpack_from('<I', data, 0)[0]
+            info = json.loads(data[4:4 + length])
+        except (struct.error, ValueError):
+            return None
+        if info.get('key') != key:
+            return None
+        return info, data[4 + length:]
+
+    def write_cache(self, cache_file, info, pixels):
+        '''
+        writes an atlas to the cache, a failed write just means decoding again next time
+        (cache file path, atlas info dict, 32 bit pixels packed in the display's format)
+        '''
+        header = json.dumps(info).encode('utf-8')
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            f = open(cache_file + '.tmp', 'wb')
+            with f:
+                f.write(struct.pack('<I', len(header)) + header + pixels)
+            os.replace(cache_file + '.tmp', cache_file) # never leave a half written atlas behind
+        except OSError:
+            pass
+
+    def build(self, atlas):
+        '''
+        turns packed pixels into surfaces, every image is a subsurface of the one atlas
+        ((atlas info dict, raw pixels)) -> (list of images)
+        '''
+        info, pixels = atlas
+        surface = pygame.Surface(info['size'], 0, 32, info['key']['masks'])
+        np.frombuffer(surface.get_buffer(), dtype=np.uint32).reshape(info['size'][1], -1)[:, :info['size'][0]] = np.frombuffer(pixels, dtype=np.uint32).reshape(info['size'][1], info['size'][0])
+        imgs = []
+        for rect, colorkey in zip(info['rects'], info['colorkeys']):
+            img = surface.subsurface(rect)
+            if colorkey:
+                img.set_colorkey(colorkey) # same colorkey convert() would have carried over
+            imgs.append(img)
+        return imgs
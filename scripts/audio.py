@@ -0,0 +1,111 @@
+import os
+import time
+
+import pygame
+
+from scripts.utils import NullSound
+
+class AudioManager:
+    def __init__(self, loader, channels=16, enabled=True):
+        '''
+        plays sound effects out of a fixed pool of mixer channels, and streams music
+        every sound has a voice limit and a minimum time between plays, so a frame full of collisions plays it once
+        instead of stealing every channel. a missing or broken file turns into a silent sound instead of a crash
+        (AssetManager to load through, mixer channels, False or no mixer makes every call do nothing)
+        '''
+        self.loader = loader
+        self.enabled = enabled and pygame.mixer.get_init() is not None
+        if self.enabled:
+            pygame.mixer.set_num_channels(channels)
+        self.sounds = {} # name -> settings, see add()
+        self.voices = {} # name -> channels it was last played on
+        self.last_played = {} # name -> time.perf_counter() of the last play
+
+    def add(self, name, path, volume=1.0, max_voices=2, min_interval=0.05, preload=True):
+        '''
+        registers a sound effect, nothing gets loaded yet
+        (name to play it by, file path, volume 0 to 1, how many can play at once,
+         seconds before it can play again, load it with the other assets or the first time it plays)
+        '''
+        self.sounds[name] = {'path': path, 'volume': volume, 'max_voices': max_voices, 'min_interval': min_interval, 'preload': preload, 'sound': None}
+        self.voices[name] = []
+        self.last_played[name] = float('-inf')
+
+    def preload(self):
+        '''
+        starts loading the sounds marked for preloading on the loader's thread pool
+        '''
+        if self.enabled:
+            self.loader.preload_sounds([sound['path'] for sound in self.sounds.values() if sound['preload']], self.load_sound)
+
+    def load_sound(self, path):
+        '''
+        loads a sound, silent if the file is missing or can't be decoded
+        (file path) -> (Sound or NullSound)
+        '''
+        if not os.path.exists(path):
+            return NullSound(path)
+        try:
+            return pygame.mixer.Sound(path)
+        except pygame.error:
+            return NullSound(path)
+
+    def get(self, name):
+        '''
+        the sound for a name, loaded the first time it's asked for (waits if it's still preloading)
+        (name) -> (Sound or NullSound)
+        '''
+        sound = self.sounds[name]
+        if sound['sound'] is None:
+            sound['sound'] = self.loader.sound(sound['path'], self.load_sound) if self.enabled else NullSound(sound['path'])
+            sound['sound'].set_volume(sound['volume'])
+        return sound['sound']
+
+    def play(self, name, loops=0):
+        '''
+        plays a sound unless it played too recently, it's at its voice limit or every channel is busy
+        (name, extra times to loop, -1 forever) -> (whether it played)
+        '''
+        if not self.enabled:
+            return False
+        now = time.perf_counter()
+        sound = self.sounds[name]
+        if now - self.last_played[name] < sound['min_interval']:
+            return False
+        clip = self.get(name)
+        voices = [channel for channel in self.voices[name] if channel.get_busy() and channel.get_sound() is clip]
+        self.voices[name] = voices
+        if len(voices) >= sound['max_voices']:
+            return False
+        channel = pygame.mixer.find_channel() # a free one, never cuts off something else
+        if channel is None or isinstance(clip, NullSound):
+            return False
+        channel.play(clip, loops=loops)
+        voices.append(channel)
+        self.last_played[name] = now
+        return True
+
+    def stop(self, name):
+        for channel in self.voices[name]:
+            if channel.get_sound() is self.sounds[name]['sound']:
+                channel.stop()
+        self.voices[name] = []
+
+    def play_music(self, path, volume=0.5, loops=-1):
+        '''
+        streams a long clip through pygame.mixer.music instead of decoding all of it into memory
+        (file path, volume 0 to 1, extra times to loop, -1 forever) -> (whether it started)
+        '''
+        if not self.enabled or not os.path.exists(path):
+            return False
+        try:
+            pygame.mixer.music.load(path)
+        except pygame.error:
+            return False
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops)
+        return True
+
+    def stop_music(self):
+        if self.enabled:
+            pygame.mixer.music.stop()
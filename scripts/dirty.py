@@ -0,0 +1,59 @@
+import pygame
+
+class DirtyRects:
+    def __init__(self, size, max_rects=128, max_coverage=0.5):
+        '''
+        keeps track of which parts of the screen changed so only those get redrawn and sent to the display
+        a frame has to redraw what got drawn this frame and what got drawn last frame (so it gets erased)
+        (screen size, redraw everything past this many rects, or past this fraction of the screen)
+        '''
+        self.screen_rect = pygame.Rect((0, 0), size)
+        self.max_rects = max_rects
+        self.max_area = max_coverage * size[0] * size[1]
+        self.previous = [] # drawn last frame
+        self.current = [] # drawn so far this frame
+        self.full = True # the next frame redraws everything
+
+    def add(self, rect):
+        self.current.append(rect)
+
+    def add_rects(self, rects):
+        self.current += rects
+
+    def add_sprites(self, sprites):
+        '''
+        marks images drawn this frame, padded a pixel since positions can be floats
+        (list of (image, position))
+        '''
+        self.current += [pygame.Rect(int(pos[0]) - 1, int(pos[1]) - 1, img.get_width() + 2, img.get_height() + 2) for img, pos in sprites]
+
+    def invalidate(self):
+        '''
+        makes the next frame redraw everything, e.g. after the whole screen moved
+        '''
+        self.full = True
+
+    def clear(self, surf, color=(0, 0, 0, 0)):
+        '''
+        erases last frame's drawing from a surface that gets redrawn every frame, instead of filling all of it
+        (surface, clear color)
+        '''
+        if self.full:
+            surf.fill(color)
+        else:
+            for rect in self.previous:
+                surf.fill(color, rect)
+
+    def frame(self):
+        '''
+        ends the frame
+        () -> (list of rects to redraw, None if it's cheaper to redraw everything)
+        '''
+        rects = None
+        if not self.full and len(self.previous) + len(self.current) <= self.max_rects:
+            rects = [rect for rect in (r.clip(self.screen_rect) for r in self.previous + self.current) if rect]
+            if sum(rect.w * rect.h for rect in rects) > self.max_area:
+                rects = None
+        self.previous, self.current = self.current, []
+        self.full = False
+        return rects
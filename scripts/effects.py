@@ -0,0 +1,71 @@
+import pygame
+import numpy as np
+
+class Effects:
+    def __init__(self, particles, sparks, spawn_budget=128, spark_color=(255, 255, 255)):
+        '''
+        owns the particle and spark pools, updates, draws and expires them every frame
+        spawning is capped per frame so a burst of deaths (or staying dead) can't flood them
+        (ParticleSystem, SparkSystem, max particles and max sparks spawned per frame, spark color)
+        '''
+        self.particles = particles
+        self.sparks = sparks
+        self.spawn_budget = spawn_budget
+        self.spark_color = spark_color
+        self.budget = {'particles': spawn_budget, 'sparks': spawn_budget} # what's left of the budget this frame
+        self.dropped = 0 # spawns turned away because the budget ran out, for monitoring
+
+    def _take(self, kind, count):
+        allowed = max(0, min(count, self.budget[kind]))
+        self.budget[kind] -= allowed
+        self.dropped += count - allowed
+        return allowed
+
+    def spawn_sparks(self, pos, angles, speeds):
+        '''
+        adds sparks if the frame's budget allows, extra ones get dropped
+        (position, angles, speeds)
+        '''
+        angles, speeds = np.broadcast_arrays(np.atleast_1d(np.asarray(angles, dtype=float)), np.atleast_1d(np.asarray(speeds, dtype=float)))
+        allowed = self._take('sparks', len(angles))
+        if allowed:
+            self.sparks.spawn(pos, angles[:allowed], speeds[:allowed])
+
+    def spawn_particles(self, pos, velocities):
+        '''
+        adds particles if the frame's budget allows, extra ones get dropped
+        (position, velocities: [[x, y], ...])
+        '''
+        velocities = np.asarray(velocities, dtype=float).reshape(-1, 2)
+        allowed = self._take('particles', len(velocities))
+        if allowed:
+            self.particles.spawn(pos, velocities[:allowed])
+
+    def update(self):
+        '''
+        moves everything, drops what finished, and refills the spawn budget for the next frame
+        '''
+        self.particles.update()
+        self.sparks.update()
+        self.budget = {'particles': self.spawn_budget, 'sparks': self.spawn_budget}
+
+    def render(self, surf, offset=(0, 0), dirty=False):
+        '''
+        draws every particle and spark
+        (surface, offset, also return where they got drawn) -> (list of rects if dirty)
+        '''
+        particles = self.particles.render(surf, offset=offset, dirty=dirty)
+        sparks = self.sparks.render(surf, self.spark_color, offset=offset, dirty=dirty)
+        if dirty:
+            return particles + sparks
+
+    def counts(self):
+        '''
+        live counts for monitoring
+        () -> ({'particles': int, 'sparks': int, 'dropped': int})
+        '''
+        return {'particles': len(self.particles), 'sparks': len(self.sparks), 'dropped': self.dropped}
+
+    def clear(self):
+        self.particles.clear()
+        self.sparks.clear()
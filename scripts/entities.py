@@ -1,10 +1,36 @@
 import pygame
 import math
 import random
+import numpy as np
 
-from scripts.particle import Particle
-from scripts.spark import Spark
 from scripts.UI import Heart
+from scripts.utils import SpriteStack, WORLD_SIZE
+
+def burst(game, center, count=30):
+    '''
+    sparks flying out of center with particles going the other way, spawned in one go
+    (game, center, how many of each)
+    '''
+    rolls = []
+    for i in range(count):
+        angle = random.random() * math.pi * 2 # random angle in a circle
+        speed = random.random() * 5
+        rolls.append((angle, speed, 2 + random.random()))
+    angles, speeds, spark_speeds = np.array(rolls).reshape(-1, 3).T
+    game.effects.spawn_sparks(center, angles, spark_speeds)
+    game.effects.spawn_particles(center, np.stack([np.cos(angles + math.pi) * speeds * 0.5, np.sin(angles * math.pi) * speeds * 0.5], axis=1))
+
+
+def death_burst(game, center):
+    '''
+    screenshake, hit sound, sparks and particles for an enemy dying
+    (game, center of the enemy)
+    '''
+    game.screenshake = max(16, game.screenshake)  # apply screenshake
+    game.audio.play('hit')
+    burst(game, center) # enemy death effect
+    game.effects.spawn_sparks(center, [0, math.pi], [5 + random.random(), 5 + random.random()]) # left and right
+
 
 class PhysicsEntity:
     def __init__(self, game, e_type, pos, size):
@@ -80,6 +106,7 @@ class PhysicsEntity:
                 self.pos[1] = entity_rect.y
 
         entity_rect = self.rect()  # Update entity rectangle for y-axis handling
+        self.game.grid.update(self, entity_rect) # keep the broad phase in sync with where we ended up
 
         # find when to flip img for animation
         if movement[0] > 0:
@@ -95,10 +122,17 @@ class PhysicsEntity:
     def render(self, surf, images, rotation, offset={0,0}, spread=1):
         '''
         partly overriding rendering for dashing
+        (surface, SpriteStack or List of images already at the game's render scale, rotation, offset, spread between layers when given a List)
         '''
-        for i, img in enumerate(images):
-            rotated_img = pygame.transform.rotate(img, rotation)
-            surf.blit(rotated_img, (self.pos[0] - rotated_img.get_width()  - offset[0] + self.anim_offset[0] // 2, self.pos[1] - rotated_img.get_height()  - offset[0] + self.anim_offset[0] // 2 - i * spread))
+        scale = self.game.render_scale
+        if isinstance(images, SpriteStack): # stack knows its own spread and rotation cache, flattened ones draw in one blit
+            anchor = ((self.pos[0] - offset[0] + self.anim_offset[0] // 2) * scale, (self.pos[1] - offset[0] + self.anim_offset[0] // 2) * scale)
+            self.game.sprites += images.render(surf, anchor, rotation)
+            return
+        for i, rotated_img in enumerate(self.game.rotation_cache.get(images, rotation)): # rotated once per angle, shared by every entity using the stack
+            pos = ((self.pos[0] - offset[0] + self.anim_offset[0] // 2) * scale - rotated_img.get_width(), (self.pos[1] - offset[0] + self.anim_offset[0] // 2) * scale - rotated_img.get_height() - i * spread * scale)
+            surf.blit(rotated_img, pos)
+            self.game.sprites.append((rotated_img, pos))
 
 
 class Player(PhysicsEntity):
@@ -119,8 +153,8 @@ class Player(PhysicsEntity):
 
 
 
-        trueWidth =  self.game.screen.get_width() + 30
-        trueHeight = self.game.screen.get_height() + 20
+        trueWidth =  WORLD_SIZE[0] + 30
+        trueHeight = WORLD_SIZE[1] + 20
 
         # Player boundary
         if self.pos[1] >= trueHeight:
@@ -137,6 +171,8 @@ class Player(PhysicsEntity):
             self.game.dead += 1
             self.pos[0] = trueWidth 
 
+        self.game.grid.update(self, self.rect()) # the clamp can move us after PhysicsEntity.update put us in the grid
+
     def rect(self):
         '''
         creates a rectangle at the entitiies current postion
@@ -157,19 +193,9 @@ class Enemies(PhysicsEntity):
     def update(self, tilemap, movement=(0,0)):
         super().update(tilemap, movement=movement)
 
-        if self.rect().colliderect(self.game.player.rect()): # if enemy hitbox collides with player
-            self.game.screenshake = max(16, self.game.screenshake)  # apply screenshake
-            self.game.sfx['hit'].play()
-            for i in range(30): # enemy death effect
-                # on death sparks
-                angle = random.random() * math.pi * 2 # random angle in a circle
-                speed = random.random() * 5
-                self.game.sparks.append(Spark(self.rect().center, angle, 2 + random.random())) 
-                # on death particles
-                self.game.particles.append(Particle(self.game, 'particle', self.rect().center, velocity=[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle * math.pi) * speed * 0.5], frame=random.randint(0, 7)))
-            self.game.sparks.append(Spark(self.rect().center, 0, 5 + random.random())) # left
-            self.game.sparks.append(Spark(self.rect().center, math.pi, 5 + random.random())) # right
-
+        rect = self.game.grid.rect(self)
+        if self.game.player in self.game.grid.query(rect, exclude=self): # if enemy hitbox collides with player, only looks at nearby cells
+            death_burst(self.game, rect.center)
             return True # [**]
         
     def rect(self):
@@ -193,19 +219,9 @@ class Boss(PhysicsEntity):
     def update(self, tilemap, movement=(0,0)):
         super().update(tilemap, movement=movement)
 
-        if self.rect().colliderect(self.game.player.rect()): # if enemy hitbox collides with player
-            self.game.screenshake = max(16, self.game.screenshake)  # apply screenshake
-            self.game.sfx['hit'].play()
-            for i in range(30): # enemy death effect
-                # on death sparks
-                angle = random.random() * math.pi * 2 # random angle in a circle
-                speed = random.random() * 5
-                self.game.sparks.append(Spark(self.rect().center, angle, 2 + random.random())) 
-                # on death particles
-                self.game.particles.append(Particle(self.game, 'particle', self.rect().center, velocity=[math.cos(angle + math.pi) * speed * 0.5, math.sin(angle * math.pi) * speed * 0.5], frame=random.randint(0, 7)))
-            self.game.sparks.append(Spark(self.rect().center, 0, 5 + random.random())) # left
-            self.game.sparks.append(Spark(self.rect().center, math.pi, 5 + random.random())) # right
-
+        rect = self.game.grid.rect(self)
+        if self.game.player in self.game.grid.query(rect, exclude=self): # if enemy hitbox collides with player, only looks at nearby cells
+            death_burst(self.game, rect.center)
             return True # [**]
         
     def rect(self):
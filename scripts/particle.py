@@ -1,3 +1,7 @@
+import numpy as np
+
+from scripts.utils import scale_image
+
 class Particle:
     def __init__(self, game, p_type, pos, velocity=[0, 0], frame=0):
         '''
@@ -32,5 +36,68 @@ class Particle:
         surf.blit(img, (self.pos[0] - offset[0] - img.get_width() // 2, self.pos[1] - offset[1] - img.get_height() // 2))
 
 
+class ParticleSystem:
+    def __init__(self, animation, capacity=2048, scale=1):
+        '''
+        fixed size pool of particles that share one animation, kept in numpy arrays and updated all at once
+        nothing gets allocated while playing, when it's full the oldest particles get recycled
+        (Animation to play, max particles, render scale the images get scaled to once and positions get drawn at)
+        '''
+        self.scale = scale
+        self.images = [scale_image(img, scale) for img in animation.images]
+        self.img_duration = animation.img_duration
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.frame = np.zeros(capacity, dtype=np.int32) # frames lived so far
+        self.lifetime = np.zeros(capacity, dtype=np.int32) # frames to live, the length of the animation
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.head = 0 # next slot to write to, always the oldest one since slots get used in order
+        self.offsets = np.array([(img.get_width() // 2, img.get_height() // 2) for img in self.images]) # to center each image
+
+    def __len__(self):
+        return int(self.alive.sum())
 
+    def spawn(self, pos, velocities):
+        '''
+        adds particles starting at pos, one per velocity
+        (position, velocities: [[x, y], ...])
+        '''
+        velocities = np.asarray(velocities, dtype=float).reshape(-1, 2)[-self.capacity:]
+        slots = (self.head + np.arange(len(velocities))) % self.capacity
+        self.pos[slots] = pos
+        self.velocity[slots] = velocities
+        self.frame[slots] = 0
+        self.lifetime[slots] = self.img_duration * len(self.images)
+        self.alive[slots] = True
+        self.head = (self.head + len(velocities)) % self.capacity
+
+    def update(self):
+        '''
+        moves and animates every particle, the ones that finished their animation last frame get removed
+        '''
+        self.alive &= self.frame < self.lifetime # same as a Particle returning kill once its animation is done
+        alive = self.alive
+        self.pos[alive] += self.velocity[alive]
+        self.frame[alive] += 1
+
+    def order(self):
+        '''
+        slots of the live particles, oldest first
+        () -> (array of slots)
+        '''
+        return (np.flatnonzero(np.roll(self.alive, -self.head)) + self.head) % self.capacity
+
+    def render(self, surf, offset=(0, 0), dirty=False):
+        '''
+        draws every particle with one blits call
+        (surface, offset, also return where they got drawn) -> (list of rects if dirty)
+        '''
+        slots = self.order()
+        imgs = np.minimum(self.frame[slots], self.lifetime[slots] - 1) // self.img_duration
+        xs = (self.pos[slots, 0] - offset[0]) * self.scale - self.offsets[imgs, 0]
+        ys = (self.pos[slots, 1] - offset[1]) * self.scale - self.offsets[imgs, 1]
+        return surf.blits([(self.images[i], (x, y)) for i, x, y in zip(imgs.tolist(), xs.tolist(), ys.tolist())], doreturn=dirty)
 
+    def clear(self):
+        self.alive[:] = False
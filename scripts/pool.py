@@ -0,0 +1,121 @@
+import numpy as np
+
+KINDS = ['enemy', 'boss']
+MOVEMENT = np.array([[1, 1], [3, 3]], dtype=float) # per kind, what Game.run moves each one by every frame
+HITBOX_OFFSET = (-30, -40) # same as Enemies.rect() and Boss.rect()
+
+class EntityPool:
+    def __init__(self, game, capacity=1024):
+        '''
+        enemies and bosses kept as numpy arrays instead of one object each
+        movement, going off screen and running into the player get worked out for the whole pool at once
+        like the Enemies/Boss objects, they move straight through tiles (the game maps only have spawners)
+        (game, starting capacity, doubles when full)
+        '''
+        self.game = game
+        self.count = 0 # entities in use, always packed at the front of the arrays
+        self.pos = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.size = np.zeros((capacity, 2))
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return int(self.alive[:self.count].sum())
+
+    def alive_count(self, e_type):
+        '''
+        how many entities of a type are alive
+        (entity type) -> (int)
+        '''
+        n = self.count
+        return int((self.alive[:n] & (self.kind[:n] == KINDS.index(e_type))).sum())
+
+    def spawn(self, e_type, pos, size):
+        '''
+        adds an entity to the end of the pool
+        (entity type, position, size)
+        '''
+        if self.count == len(self.pos): # full, double everything
+            for name in ['pos', 'velocity', 'size', 'kind', 'alive']:
+                arr = getattr(self, name)
+                setattr(self, name, np.concatenate([arr, np.zeros_like(arr)]))
+        i = self.count
+        self.pos[i] = pos
+        self.velocity[i] = 0
+        self.size[i] = size
+        self.kind[i] = KINDS.index(e_type)
+        self.alive[i] = True
+        self.count += 1
+
+    def compact(self):
+        '''
+        drops dead entities, keeping the rest in spawn order
+        '''
+        n = self.count
+        keep = self.alive[:n]
+        m = int(keep.sum())
+        if m == n:
+            return
+        for arr in [self.pos, self.velocity, self.size, self.kind]:
+            arr[:m] = arr[:n][keep]
+        self.alive[:m] = True
+        self.alive[m:n] = False
+        self.count = m
+
+    def rects(self):
+        '''
+        hitboxes of everything in the pool, truncated like pygame.Rect does
+        () -> (lefts, tops, widths, heights)
+        '''
+        n = self.count
+        return np.trunc(self.pos[:n, 0] + HITBOX_OFFSET[0]), np.trunc(self.pos[:n, 1] + HITBOX_OFFSET[1]), self.size[:n, 0], self.size[:n, 1]
+
+    def update(self, player_rect, bounds):
+        '''
+        moves everything, kills what ran into the player and what left the screen
+        the dead are dropped before returning, so like the object loops they don't get drawn this frame
+        (player rect, (right edge, bottom edge)) -> (list of centers of the entities that hit the player, enemies first)
+        '''
+        n = self.count
+        pos = self.pos[:n]
+        kind = self.kind[:n]
+        pos += self.velocity[:n] + MOVEMENT[kind]
+
+        left, top, width, height = self.rects()
+        hit = (left < player_rect.right) & (player_rect.left < left + width) & (top < player_rect.bottom) & (player_rect.top < top + height)
+        gone = (pos[:, 1] >= bounds[1]) | (pos[:, 0] < 50) | (pos[:, 1] < 60) | (pos[:, 0] > bounds[0])
+        self.alive[:n] = ~(hit | gone)
+
+        centers = []
+        for k in range(len(KINDS)): # same order as the enemy loop then the boss loop
+            idx = np.flatnonzero(hit & (kind == k))
+            centers += list(zip((left[idx] + width[idx] // 2).astype(int).tolist(), (top[idx] + height[idx] // 2).astype(int).tolist()))
+        self.compact() # after the centers, width and height are views that compacting shifts
+        return centers
+
+    def render(self, surf, stacks, offset=(0, 0), anim_offset=(-3, -3)):
+        '''
+        draws every entity with one blits call per type, all of a type share one rotation
+        (surface, {entity type: (SpriteStack, rotation)}, offset, anim offset)
+        '''
+        n = self.count
+        for k, e_type in enumerate(KINDS):
+            if e_type not in stacks:
+                continue
+            idx = np.flatnonzero(self.kind[:n] == k)
+            if not len(idx):
+                continue
+            stack, rotation = stacks[e_type]
+            flat, flat_offset = stack.img(rotation)
+            # same spot PhysicsEntity.render puts a flattened stack
+            scale = self.game.render_scale
+            xs = (self.pos[idx, 0] - offset[0] + anim_offset[0] // 2) * scale + flat_offset[0]
+            ys = (self.pos[idx, 1] - offset[0] + anim_offset[0] // 2) * scale + flat_offset[1]
+            positions = list(zip(xs.tolist(), ys.tolist()))
+            surf.blits([(flat, pos) for pos in positions], doreturn=False)
+            self.game.sprites += [(flat, pos) for pos in positions]
+
+    def clear(self):
+        self.alive[:self.count] = False
+        self.count = 0
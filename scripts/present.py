@@ -0,0 +1,78 @@
+import math
+
+import pygame
+
+class Presenter:
+    def __init__(self, size, render_scale=1):
+        '''
+        the last step of a frame, puts the display on the window
+        the game draws into a display render_scale times the window's size, which gets scaled up to fill the window
+        at a render scale of 1 the display is blitted straight on, otherwise it gets scaled into one surface made up front
+        (window size, display resolution as a fraction of it, e.g. 0.5 draws 1140x810 at 570x405)
+        '''
+        self.size = tuple(size)
+        self.render_scale = render_scale
+        self.display_size = (max(1, round(size[0] * render_scale)), max(1, round(size[1] * render_scale)))
+        self.zoom = (size[0] / self.display_size[0], size[1] / self.display_size[1]) # window pixels per display pixel
+        self.scaled = self.display_size != self.size
+        self.screen = None
+        self.target = None # what the display gets scaled into, made the first time it's needed
+
+    def open(self, screen=None):
+        '''
+        makes the window, or presents onto a surface given instead
+        (surface to present onto, None makes the window) -> (window surface)
+        '''
+        self.screen = screen if screen is not None else pygame.display.set_mode(self.size)
+        return self.screen
+
+    def make_display(self):
+        '''
+        a surface to draw the frame on, the size this presenter expects
+        () -> (Surface)
+        '''
+        return pygame.Surface(self.display_size, pygame.SRCALPHA)
+
+    def scale(self, display):
+        '''
+        the display at the window's resolution, reuses the same target surface every frame
+        (display) -> (surface the size of the window, the display itself at a render scale of 1)
+        '''
+        if not self.scaled:
+            return display
+        if self.target is None:
+            self.target = pygame.Surface(self.size, display.get_flags(), display) # same pixel format, scale needs it
+        pygame.transform.scale(display, self.size, self.target)
+        return self.target
+
+    def to_screen(self, rect):
+        '''
+        the part of the window a rect on the display ends up covering, rounded outwards
+        (Rect on the display) -> (Rect on the window)
+        '''
+        if not self.scaled:
+            return rect
+        left, top = math.floor(rect.left * self.zoom[0]), math.floor(rect.top * self.zoom[1])
+        right, bottom = math.ceil(rect.right * self.zoom[0]), math.ceil(rect.bottom * self.zoom[1])
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def present(self, display, background, offset=(0, 0)):
+        '''
+        draws the background and the display over it, then updates the whole window
+        (display, background image, offset in window pixels e.g. screenshake)
+        '''
+        self.screen.blit(background, (0, 0))
+        self.screen.blit(self.scale(display), offset)
+        pygame.display.update()
+
+    def present_rects(self, display, background, rects):
+        '''
+        same as present but only redraws and updates where something changed
+        (display, background image, list of Rects on the display)
+        '''
+        img = self.scale(display)
+        rects = [self.to_screen(rect) for rect in rects]
+        for rect in rects:
+            self.screen.blit(background, rect, rect)
+            self.screen.blit(img, rect, rect)
+        pygame.display.update(rects)
@@ -0,0 +1,166 @@
+import time
+
+import numpy as np
+import pygame
+
+from scripts.UI import get_font
+
+OVERLAY_FONT = 'monospace'
+
+class NullScope:
+    '''
+    what a disabled profiler hands out, one shared object that does nothing
+    '''
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SCOPE = NullScope()
+
+class Scope:
+    __slots__ = ('samples', 'start')
+
+    def __init__(self, samples):
+        '''
+        times one named phase, made once per name and reused every frame
+        (buffer the timings go into)
+        '''
+        self.samples = samples
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+class RingBuffer:
+    __slots__ = ('values', 'index', 'full')
+
+    def __init__(self, size):
+        '''
+        the last size timings of a phase, older ones get overwritten
+        (how many to keep)
+        '''
+        self.values = np.zeros(size)
+        self.index = 0
+        self.full = False
+
+    def append(self, value):
+        self.values[self.index] = value
+        self.index += 1
+        if self.index == len(self.values):
+            self.index = 0
+            self.full = True
+
+    def window(self):
+        return self.values if self.full else self.values[:self.index]
+
+    def last(self):
+        if not self.full and not self.index:
+            return None
+        return self.values[self.index - 1]
+
+class Profiler:
+    def __init__(self, enabled=False, window=240, refresh=30):
+        '''
+        times named phases of the frame and keeps live counts, with an overlay to show them in game
+        while disabled scope() hands back one shared do-nothing object, so the scopes can stay in the game loop for good
+        (start enabled, frames the averages and percentiles cover, frames between overlay redraws)
+        '''
+        self.enabled = enabled
+        self.keep = enabled # whether to keep profiling once the overlay is hidden
+        self.window = window
+        self.refresh = refresh
+        self.show = False
+        self.scopes = {} # phase name -> Scope, in the order they first ran
+        self.counts = {} # name -> latest value
+        self.frames = 0
+        self.overlay = None # last drawn overlay image
+
+    def scope(self, name):
+        '''
+        times the code inside a with block under a name
+        (phase name) -> (context manager)
+        '''
+        if not self.enabled:
+            return NULL_SCOPE
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(RingBuffer(self.window))
+        return scope
+
+    def count(self, name, value):
+        '''
+        records a live count, e.g. how many enemies are alive
+        (name, value)
+        '''
+        if self.enabled:
+            self.counts[name] = value
+
+    def last(self, name):
+        '''
+        the most recent timing of a phase
+        (phase name) -> (seconds, None if it hasn't run while enabled)
+        '''
+        scope = self.scopes.get(name)
+        return None if scope is None else scope.samples.last()
+
+    def toggle(self):
+        '''
+        shows or hides the overlay, profiling runs while it's shown
+        '''
+        self.show = not self.show
+        self.enabled = self.show or self.keep
+        self.overlay = None
+
+    def stats(self):
+        '''
+        timings of every phase over the window, in milliseconds
+        () -> ({phase name: {'avg': ms, 'p95': ms, 'p99': ms, 'max': ms}})
+        '''
+        stats = {}
+        for name, scope in self.scopes.items():
+            samples = scope.samples.window()
+            if not len(samples):
+                continue
+            p95, p99 = np.percentile(samples, [95, 99]) * 1000
+            stats[name] = {'avg': float(samples.mean() * 1000), 'p95': float(p95), 'p99': float(p99), 'max': float(samples.max() * 1000)}
+        return stats
+
+    def lines(self):
+        '''
+        what the overlay shows, one line per phase then the counts
+        () -> (list of strings)
+        '''
+        lines = [f"{'phase':12s} {'avg':>6s} {'p95':>6s} {'p99':>6s} ms"]
+        for name, stat in self.stats().items():
+            lines.append(f"{name:12s} {stat['avg']:6.2f} {stat['p95']:6.2f} {stat['p99']:6.2f}")
+        if self.counts:
+            lines.append('')
+            lines += [f'{name:12s} {value}' for name, value in self.counts.items()]
+        return lines
+
+    def render(self, surf, pos=(10, 40), size=14):
+        '''
+        draws the overlay if it's shown, the text only gets redrawn every refresh frames
+        (surface, top left, font size) -> (Rect it covered, None if hidden)
+        '''
+        if not self.show:
+            return None
+        self.frames += 1
+        if self.overlay is None or self.frames >= self.refresh:
+            self.frames = 0
+            font = get_font(OVERLAY_FONT, size)
+            imgs = [font.render(line, False, (255, 255, 255)) for line in self.lines()]
+            self.overlay = pygame.Surface((max(img.get_width() for img in imgs) + 8, len(imgs) * font.get_linesize() + 8), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 160))
+            for i, img in enumerate(imgs):
+                self.overlay.blit(img, (4, 4 + i * font.get_linesize()))
+        return surf.blit(self.overlay, pos)
@@ -0,0 +1,88 @@
+import os
+import struct
+
+import pygame
+
+REPLAY_EXTENSION = '.replay'
+REPLAY_MAGIC = b'RPLY'
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct('<4sHQI') # magic, version, seed, ticks
+REPLAY_SEEDS = range(2 ** 64) # seeds the header can hold
+REPLAY_EVENT = struct.Struct('<IBB') # tick, event kind, key
+REPLAY_KEYS = [pygame.K_a, pygame.K_d, pygame.K_l] # the only keys the game reacts to, stored as their index
+REPLAY_KINDS = [pygame.KEYDOWN, pygame.KEYUP]
+
+class InputRecorder:
+    def __init__(self, path, seed):
+        '''
+        writes the rng seed and every A/D/L key press and release with the tick it happened on
+        6 bytes an event, written as they come, the tick count goes into the header on close()
+        (file to write, REPLAY_EXTENSION gets added if it doesn't end with it, seed the game's random was seeded with, 0 to 2**64 - 1)
+        '''
+        if seed not in REPLAY_SEEDS:
+            raise ValueError(f'replays can only store seeds from 0 to 2**64 - 1, not {seed}')
+        self.path = path if path.endswith(REPLAY_EXTENSION) else path + REPLAY_EXTENSION
+        self.seed = seed
+        self.ticks = 0
+        self.file = open(self.path, 'wb')
+        self.file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, 0))
+
+    def record(self, tick, event):
+        '''
+        records an event if it's one the replay needs, everything else is ignored
+        (tick it's handled before, pygame event)
+        '''
+        if event.type in REPLAY_KINDS and event.key in REPLAY_KEYS:
+            self.file.write(REPLAY_EVENT.pack(tick, REPLAY_KINDS.index(event.type), REPLAY_KEYS.index(event.key)))
+
+    def close(self, ticks):
+        '''
+        finishes the file, safe to call more than once
+        (how many ticks the game ran)
+        '''
+        if self.file is None:
+            return
+        self.file.seek(0)
+        self.file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, ticks))
+        self.file.close()
+        self.file = None
+
+def load_replay(path):
+    '''
+    reads a file written by InputRecorder
+    (path, REPLAY_EXTENSION can be left off) -> (seed, ticks, {tick: [pygame events handled before that tick]})
+    '''
+    if not os.path.exists(path) and os.path.exists(path + REPLAY_EXTENSION):
+        path += REPLAY_EXTENSION
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        magic, version, seed, ticks = REPLAY_HEADER.unpack_from(data, 0)
+    except struct.error:
+        raise ValueError(path + ' is too short to be a replay')
+    if magic != REPLAY_MAGIC:
+        raise ValueError(path + ' is not a replay')
+    if version != REPLAY_VERSION:
+        raise ValueError(path + ' is replay version ' + str(version) + ', expected ' + str(REPLAY_VERSION))
+    events = {}
+    for tick, kind, key in REPLAY_EVENT.iter_unpack(data[REPLAY_HEADER.size:len(data) - (len(data) - REPLAY_HEADER.size) % REPLAY_EVENT.size]):
+        events.setdefault(tick, []).append(pygame.event.Event(REPLAY_KINDS[kind], key=REPLAY_KEYS[key]))
+    if not ticks and events: # never closed (the game crashed), play up to the last event
+        ticks = max(events) + 1
+    return seed, ticks, events
+
+def play_replay(path, render=True, **game_args):
+    '''
+    plays a replay back headless and as fast as it goes, through the same frame code as the live loop
+    (replay file, draw and present every frame (off only runs the simulation), anything else Game takes) -> (Game after the last tick)
+    '''
+    from game import Game # game imports this module
+    seed, ticks, events = load_replay(path)
+    game = Game(headless=True, seed=seed, **game_args)
+    game.profiler.window = max(ticks, 1) # timings cover the whole replay, not just the end of it
+    try:
+        for tick in range(ticks):
+            game.frame(events.get(tick, ()), render=render)
+    finally:
+        game.close()
+    return game
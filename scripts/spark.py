@@ -1,6 +1,7 @@
 import math
 import random
 import pygame
+import numpy as np
 
 class Spark:
     def __init__(self, pos, angle, speed):
@@ -36,3 +37,74 @@ class Spark:
 
         ]
         pygame.draw.polygon(surf, color, render_points)
+
+
+class SparkSystem:
+    def __init__(self, capacity=4096, scale=1):
+        '''
+        fixed size pool of sparks kept in numpy arrays and updated all at once
+        nothing gets allocated while playing, when it's full the oldest sparks get recycled
+        (max sparks, render scale the polygons get drawn at)
+        '''
+        self.capacity = capacity
+        self.scale = scale
+        self.pos = np.zeros((capacity, 2))
+        self.angle = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.head = 0 # next slot to write to, always the oldest one since slots get used in order
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def spawn(self, pos, angles, speeds):
+        '''
+        adds sparks starting at pos, angles and speeds can be single values or lists
+        (position, angles, speeds)
+        '''
+        angles, speeds = np.broadcast_arrays(np.atleast_1d(np.asarray(angles, dtype=float)), np.atleast_1d(np.asarray(speeds, dtype=float)))
+        angles, speeds = angles[-self.capacity:], speeds[-self.capacity:]
+        slots = (self.head + np.arange(len(angles))) % self.capacity
+        self.pos[slots] = pos
+        self.angle[slots] = angles
+        self.speed[slots] = speeds
+        self.alive[slots] = True
+        self.head = (self.head + len(angles)) % self.capacity
+
+    def update(self):
+        '''
+        moves and slows every spark, the ones that stopped last frame get removed
+        '''
+        self.alive &= self.speed > 0 # same as a Spark returning kill once its speed hits 0
+        alive = self.alive
+        angle, speed = self.angle[alive], self.speed[alive]
+        self.pos[alive] += np.stack([np.cos(angle) * speed, np.sin(angle) * speed], axis=1)
+        self.speed[alive] = np.maximum(0, speed - 0.1)
+
+    def order(self):
+        '''
+        slots of the live sparks, oldest first
+        () -> (array of slots)
+        '''
+        return (np.flatnonzero(np.roll(self.alive, -self.head)) + self.head) % self.capacity
+
+    def render(self, surf, color, offset=(0,0), dirty=False):
+        '''
+        renders every spark as the same polygon Spark.render draws
+        (surface, color, offset=(0,0), also return where they got drawn) -> (list of rects if dirty)
+        '''
+        slots = self.order()
+        pos, angle, speed = self.pos[slots] - offset, self.angle[slots], self.speed[slots]
+        points = np.empty((len(slots), 4, 2))
+        for i, (turn, length) in enumerate([(0, 3), (math.pi * 0.5, 0.5), (math.pi, 3), (-math.pi * 0.5, 0.5)]): # one part of the spark is longer
+            points[:, i, 0] = pos[:, 0] + np.cos(angle + turn) * speed * length
+            points[:, i, 1] = pos[:, 1] + np.sin(angle + turn) * speed * length
+        if self.scale != 1:
+            points *= self.scale
+        if dirty:
+            return [pygame.draw.polygon(surf, color, polygon) for polygon in points.tolist()]
+        for polygon in points.tolist():
+            pygame.draw.polygon(surf, color, polygon)
+
+    def clear(self):
+        self.alive[:] = False
@@ -0,0 +1,91 @@
+class SpatialHash:
+    def __init__(self, cell_size=64):
+        '''
+        broad phase for collisions, buckets objects into a uniform grid so queries only look at nearby cells
+        (cell size in px)
+        '''
+        self.cell_size = cell_size
+        self.cells = {} # (cell x, cell y) -> set of objects in that cell
+        self.objects = {} # object -> (rect, (first cell, last cell))
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __contains__(self, obj):
+        return obj in self.objects
+
+    def cell_range(self, rect):
+        '''
+        returns the top left and bottom right cells a rectangle touches
+        (rect) -> ((cell x, cell y), (cell x, cell y))
+        '''
+        return ((rect.left // self.cell_size, rect.top // self.cell_size), ((rect.right - 1) // self.cell_size, (rect.bottom - 1) // self.cell_size))
+
+    def update(self, obj, rect):
+        '''
+        adds an object or moves it to its new rectangle, only touching the cells if it changed cells
+        (object, rect)
+        '''
+        cells = self.cell_range(rect)
+        if obj in self.objects:
+            old_cells = self.objects[obj][1]
+            if old_cells == cells: # still in the same cells, just keep the new rect
+                self.objects[obj] = (rect, cells)
+                return
+            self._unlink(obj, old_cells)
+        self.objects[obj] = (rect, cells)
+        for x in range(cells[0][0], cells[1][0] + 1):
+            for y in range(cells[0][1], cells[1][1] + 1):
+                self.cells.setdefault((x, y), set()).add(obj)
+
+    def remove(self, obj):
+        '''
+        takes an object out of the grid, does nothing if it isn't in it
+        (object)
+        '''
+        if obj in self.objects:
+            self._unlink(obj, self.objects.pop(obj)[1])
+
+    def _unlink(self, obj, cells):
+        for x in range(cells[0][0], cells[1][0] + 1):
+            for y in range(cells[0][1], cells[1][1] + 1):
+                cell = self.cells[(x, y)]
+                cell.discard(obj)
+                if not cell: # drop empty cells so the dict doesn't grow forever
+                    del self.cells[(x, y)]
+
+    def rect(self, obj):
+        '''
+        returns the rectangle an object was last registered with
+        (object) -> (rect)
+        '''
+        return self.objects[obj][0]
+
+    def query(self, rect, exclude=None):
+        '''
+        returns every object whose rectangle collides with rect, only checking the cells rect touches
+        (rect, object to leave out) -> (list of objects)
+        '''
+        cells = self.cell_range(rect)
+        found = []
+        seen = set()
+        for x in range(cells[0][0], cells[1][0] + 1):
+            for y in range(cells[0][1], cells[1][1] + 1):
+                for obj in self.cells.get((x, y), ()):
+                    if obj is not exclude and obj not in seen:
+                        seen.add(obj)
+                        if rect.colliderect(self.objects[obj][0]):
+                            found.append(obj)
+        return found
+
+    def query_point(self, pos):
+        '''
+        returns every object whose rectangle contains the point
+        (position) -> (list of objects)
+        '''
+        cell = self.cells.get((int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)), ())
+        return [obj for obj in cell if self.objects[obj][0].collidepoint(pos)]
+
+    def clear(self):
+        self.cells.clear()
+        self.objects.clear()
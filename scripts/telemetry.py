@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError: # not on windows
+    resource = None
+
+# one row per frame, times in milliseconds, memory in kilobytes, blank/null when it wasn't measured
+FIELDS = ['frame', 'time', 'frame_ms', 'busy_ms', 'step_ms', 'render_ms', 'present_ms',
+          'enemies', 'bosses', 'projectiles', 'particles', 'sparks', 'rss_kb', 'traced_kb', 'traced_peak_kb']
+INT_FIELDS = {'frame', 'enemies', 'bosses', 'projectiles', 'particles', 'sparks'}
+
+def rss_kb():
+    '''
+    how much memory the process is holding right now, the peak where the current amount can't be read
+    () -> (kilobytes, None if neither can be read)
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # kilobytes on linux, bytes on mac
+    return None
+
+class Telemetry:
+    def __init__(self, path, capacity=1024, memory_every=60, trace_memory=False):
+        '''
+        records a row of frame times and counts every frame for long soak runs
+        rows go into a ring buffer and get written out in bulk whenever it fills up, and on close()
+        the file format comes from the extension, .csv or .jsonl
+        (file to write, rows buffered between writes, frames between memory readings,
+         also track python allocations with tracemalloc, which slows everything down)
+        '''
+        self.path = path
+        self.jsonl = path.endswith('.jsonl')
+        self.rows = np.full((capacity, len(FIELDS)), np.nan)
+        self.count = 0 # rows waiting to be written
+        self.frame = 0
+        self.memory_every = memory_every
+        self.memory = [None, None, None] # last rss, traced and traced peak readings, repeated until the next one
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.start = time.perf_counter()
+        self.last_time = None
+        self.file = open(path, 'w', newline='')
+        if not self.jsonl:
+            self.file.write(','.join(FIELDS) + '\n')
+
+    def read_memory(self):
+        self.memory[0] = rss_kb()
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self.memory[1:] = [current // 1024, peak // 1024]
+
+    def record(self, times, counts):
+        '''
+        adds a row for this frame, call it once a frame
+        ({'busy': s, 'step': s, 'render': s, 'present': s} any missing is left blank,
+         {'enemies': n, 'bosses': n, 'projectiles': n, 'particles': n, 'sparks': n})
+        '''
+        now = time.perf_counter()
+        if self.frame % self.memory_every == 0:
+            self.read_memory()
+        row = self.rows[self.count]
+        row[:] = np.nan
+        row[0] = self.frame
+        row[1] = now - self.start
+        if self.last_time is not None:
+            row[2] = (now - self.last_time) * 1000 # whole frame, including the wait for the next one
+        for i, name in enumerate(['busy', 'step', 'render', 'present']):
+            if times.get(name) is not None:
+                row[3 + i] = times[name] * 1000
+        for i, name in enumerate(['enemies', 'bosses', 'projectiles', 'particles', 'sparks']):
+            row[7 + i] = counts.get(name, np.nan)
+        for i, value in enumerate(self.memory):
+            if value is not None:
+                row[12 + i] = value
+        self.last_time = now
+        self.frame += 1
+        self.count += 1
+        if self.count == len(self.rows):
+            self.flush()
+
+    def format(self, row):
+        values = [None if np.isnan(value) else int(value) if name in INT_FIELDS or name.endswith('_kb') else round(float(value), 4) for name, value in zip(FIELDS, row)]
+        if self.jsonl:
+            return json.dumps(dict(zip(FIELDS, values)))
+        return ','.join('' if value is None else str(value) for value in values)
+
+    def flush(self):
+        '''
+        writes out every buffered row in one go
+        '''
+        if not self.count or self.file is None:
+            return
+        self.file.write('\n'.join(self.format(row) for row in self.rows[:self.count]) + '\n')
+        self.file.flush()
+        self.count = 0
+
+    def close(self):
+        '''
+        writes what's left and closes the file, safe to call more than once
+        '''
+        if self.file is None:
+            return
+        self.flush()
+        self.file.close()
+        self.file = None
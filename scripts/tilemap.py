@@ -1,11 +1,18 @@
+import os
+import sys
+import math
 import json
+import mmap
+import struct
 import pygame
+import numpy as np
+from array import array
 
 # depends on order location that we are rendering the tiles, tuple(sorted() solves this, + we can't use list as a key therefore tuple
 AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (0, 1)])): 0,
     tuple(sorted([(1, 0), (0, 1), (-1, 0)])): 1,
-    tuple(sorted([(-1, 0), (0, 1)])): 2, 
+    tuple(sorted([(-1, 0), (0, 1)])): 2,
     tuple(sorted([(-1, 0), (0, -1), (0, 1)])): 3,
     tuple(sorted([(-1, 0), (0, -1)])): 4,
     tuple(sorted([(-1, 0), (0, -1), (1, 0)])): 5,
@@ -13,45 +20,284 @@ AUTOTILE_MAP = {
     tuple(sorted([(1, 0), (0, -1), (0, 1)])): 7,
     tuple(sorted([(1, 0), (-1, 0), (0, 1), (0, -1)])): 8,
 }
+# the same table as a 4 bit neighbor mask -> variant list, None where AUTOTILE_MAP has no entry (variant is left alone)
+AUTOTILE_BITS = [((1, 0), 1), ((-1, 0), 2), ((0, -1), 4), ((0, 1), 8)]
+AUTOTILE_VARIANTS = [AUTOTILE_MAP.get(tuple(sorted(shift for shift, bit in AUTOTILE_BITS if mask & bit))) for mask in range(16)]
 NEIGHBOR_OFFSET = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (0, 0), (-1, 1), (0, 1), (1, 1)]
 PHYSICS_TILES = {'grass', 'stone'}
 AUTOTILE_TYPES = {'grass', 'stone'}
 
+CHUNK_SHIFT = 4
+CHUNK_SIZE = 1 << CHUNK_SHIFT # tiles per side of a chunk, a power of 2 so positions split with shifts and masks
+CHUNK_MASK = CHUNK_SIZE - 1
+CHUNK_AREA = CHUNK_SIZE * CHUNK_SIZE
+
+# binary map format, picked by file extension in Tilemap.load/save (everything little endian)
+#   header: magic, version, tile size, chunk size, type count, chunk count, offgrid bytes
+#   type names: u16 length + utf-8 each, type id = position + 1
+#   offgrid: the offgrid tiles as json, so they come back exactly as saved
+#   chunk table (4 byte aligned): x, y, tile count per chunk
+#   chunk records: CHUNK_AREA u16 type ids then CHUNK_AREA u16 variants per chunk, same order as the table
+BINARY_EXTENSION = '.tmap'
+BINARY_MAGIC = b'TMAP'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHHHII')
+BINARY_CHUNK = np.dtype([('x', '<i4'), ('y', '<i4'), ('count', '<u2'), ('pad', '<u2')])
+
+class Chunk:
+    __slots__ = ('types', 'variants', 'count')
+
+    def __init__(self, types=None, variants=None, count=0):
+        '''
+        a CHUNK_SIZE x CHUNK_SIZE block of tiles stored as compact arrays, row by row
+        types hold type ids (0 = no tile), variants hold the variant of each tile
+        chunks from a binary map use u16 views straight into the mapped file instead of arrays
+        (type ids, variants, tiles in the chunk)
+        '''
+        self.types = array('H', bytes(2 * CHUNK_AREA)) if types is None else types
+        self.variants = array('H', bytes(2 * CHUNK_AREA)) if variants is None else variants
+        self.count = count # tiles in the chunk, empty chunks get dropped
+
 class Tilemap:
-    def __init__(self, game, tile_size=16):
+    def __init__(self, game, tile_size=16, render_scale=1):
         '''
         initializing tilemap
-        (game, tile size 16x16 px)
+        (game, tile size 16x16 px, render scale the baked chunks get scaled to once and drawn at)
         '''
         self.game = game
         self.tile_size = tile_size
-        self.tilemap = {} # map tile based on location, using a dictionary for conveince (dont have to fill in all the space like lists) 
+        self.render_scale = render_scale
+        self.chunks = {} # (chunk x, chunk y) -> Chunk, only chunks with tiles in them exist
+        self.type_names = [None] # type id -> type name, id 0 means no tile
+        self.type_ids = {} # type name -> type id
+        self.physics_ids = set() # ids of the types in PHYSICS_TILES
+        self.autotile_ids = set() # ids of the types in AUTOTILE_TYPES
         self.offgrid_tiles = []
+        # (type name, variant) -> where those tiles are, built the first time extract needs it then kept up to date
+        self.locations = None # grid tiles: {(grid x, grid y): None}, a dict so it keeps the order tiles were added in
+        self.offgrid_locations = None # offgrid tiles: {id(tile): tile}
+        self.loaded = None # (path, mtime, size) of the file last loaded, to know when the same map comes back
+        self.loaded_locations = None # (loaded, copy of locations straight after building them) for reloads of that file
+        self.surfaces = {} # (chunk x, chunk y) -> baked surface of everything drawn in that chunk, None if it's empty
+        # dense copy of which cells hold a physics tile, row by row over the chunks in use plus an empty 1 tile border
+        self.solid = bytearray()
+        self.solid_origin = (0, 0) # grid position of solid[0]
+        self.solid_size = (0, 0) # (width, height) in tiles
+        self.solid_chunks = None # (first chunk x, first chunk y, last chunk x, last chunk y) the bitmap covers, None if it's empty
+        self.solid_neighbors = [] # NEIGHBOR_OFFSET as offsets into solid
+        self.solid_rects = {} # index into solid -> Rect of that tile, made the first time it's asked for
+
+    def type_id(self, tile_type):
+        '''
+        returns the id used to store a tile type, registering it the first time
+        (type name) -> (int)
+        '''
+        type_id = self.type_ids.get(tile_type)
+        if type_id is None:
+            type_id = self.type_ids[tile_type] = len(self.type_names)
+            self.type_names.append(tile_type)
+            if tile_type in PHYSICS_TILES:
+                self.physics_ids.add(type_id)
+            if tile_type in AUTOTILE_TYPES:
+                self.autotile_ids.add(type_id)
+        return type_id
+
+    def _cell(self, x, y):
+        '''
+        returns the chunk a grid position is in (None if there isn't one) and the index inside it
+        (grid x, grid y) -> (Chunk, index)
+        '''
+        return self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)), ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+
+    def type_at(self, x, y):
+        '''
+        returns the type id of the tile at a grid position, 0 if there's no tile
+        (grid x, grid y) -> (int)
+        '''
+        chunk = self.chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk is None:
+            return 0
+        return chunk.types[((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)]
+
+    def get_tile(self, x, y):
+        '''
+        returns the tile at a grid position in the same form the json map uses, or None
+        (grid x, grid y) -> ({'type', 'variant', 'pos'})
+        '''
+        chunk, i = self._cell(x, y)
+        if chunk is None or not chunk.types[i]:
+            return None
+        return {'type': self.type_names[chunk.types[i]], 'variant': chunk.variants[i], 'pos': [x, y]}
+
+    def set_tile(self, x, y, tile_type, variant):
+        '''
+        places a tile on the grid, replacing what was there
+        (grid x, grid y, type name, variant)
+        '''
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = Chunk()
+        i = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+        if chunk.types[i] == self.type_ids.get(tile_type) and chunk.variants[i] == variant:
+            return # already there, keep the baked chunk
+        if chunk.types[i]:
+            self.invalidate_tile(self.type_names[chunk.types[i]], chunk.variants[i], (x * self.tile_size, y * self.tile_size))
+            self.unlocate(self.type_names[chunk.types[i]], chunk.variants[i], (x, y))
+        else:
+            chunk.count += 1
+        chunk.types[i] = self.type_id(tile_type)
+        chunk.variants[i] = variant
+        self.locate(tile_type, variant, (x, y))
+        self.set_solid(x, y, chunk.types[i] in self.physics_ids)
+        self.invalidate_tile(tile_type, variant, (x * self.tile_size, y * self.tile_size))
+
+    def remove_tile(self, x, y):
+        '''
+        takes a tile off the grid
+        (grid x, grid y) -> (the removed tile, None if there wasn't one)
+        '''
+        tile = self.get_tile(x, y)
+        if tile is not None:
+            key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+            chunk = self.chunks[key]
+            i = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+            chunk.types[i] = 0
+            chunk.variants[i] = 0
+            chunk.count -= 1
+            if not chunk.count:
+                del self.chunks[key]
+            self.set_solid(x, y, False)
+            self.invalidate_tile(tile['type'], tile['variant'], (x * self.tile_size, y * self.tile_size))
+            self.unlocate(tile['type'], tile['variant'], (x, y))
+        return tile
+
+    def add_offgrid(self, tile):
+        '''
+        places a tile off the grid
+        (tile: {'type', 'variant', 'pos' in px})
+        '''
+        self.offgrid_tiles.append(tile)
+        self.invalidate_tile(tile['type'], tile['variant'], tile['pos'])
+        if self.offgrid_locations is not None:
+            self.offgrid_locations.setdefault((tile['type'], tile['variant']), {})[id(tile)] = tile
+
+    def remove_offgrid(self, tile):
+        '''
+        takes a tile out of the offgrid tiles
+        (tile, the same object that's in offgrid_tiles)
+        '''
+        self.offgrid_tiles.remove(tile)
+        self.invalidate_tile(tile['type'], tile['variant'], tile['pos'])
+        if self.offgrid_locations is not None:
+            self.offgrid_locations[(tile['type'], tile['variant'])].pop(id(tile))
+
+    def locate(self, tile_type, variant, pos):
+        '''
+        adds a grid tile to the (type, variant) index, if it's been built
+        (type name, variant, grid position)
+        '''
+        self.loaded = None # the tiles don't match the file anymore
+        if self.locations is not None:
+            self.locations.setdefault((tile_type, variant), {})[pos] = None
+
+    def unlocate(self, tile_type, variant, pos):
+        '''
+        takes a grid tile out of the (type, variant) index, if it's been built
+        (type name, variant, grid position)
+        '''
+        self.loaded = None
+        if self.locations is not None:
+            self.locations[(tile_type, variant)].pop(pos)
+
+    def reset_locations(self, path):
+        '''
+        drops the (type, variant) index after a load, extract builds it again when it needs it
+        reloading the same unchanged file (restarting a level) gets back a copy of the grid index kept from the last build instead
+        (file path that was just loaded)
+        '''
+        stat = os.stat(path)
+        self.loaded = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        self.offgrid_locations = None # the offgrid tiles are new objects, cheap to index again
+        self.locations = None
+        if self.loaded_locations is not None and self.loaded_locations[0] == self.loaded:
+            self.locations = {pair: positions.copy() for pair, positions in self.loaded_locations[1].items()}
+
+    def build_locations(self):
+        '''
+        indexes every tile by (type, variant), the grid part is worked out for all chunks at once with numpy
+        skips the grid part if reset_locations already brought it back
+        '''
+        self.offgrid_locations = {}
+        for tile in self.offgrid_tiles:
+            self.offgrid_locations.setdefault((tile['type'], tile['variant']), {})[id(tile)] = tile
+
+        if self.locations is not None:
+            return
+        self.locations = {}
+        if not self.chunks:
+            return
+        keys = np.array(list(self.chunks))
+        types = np.array([np.frombuffer(chunk.types, dtype=np.uint16) for chunk in self.chunks.values()])
+        variants = np.array([np.frombuffer(chunk.variants, dtype=np.uint16) for chunk in self.chunks.values()])
+        chunk_index, cell = np.nonzero(types)
+        codes = (types[chunk_index, cell].astype(np.int64) << 16) | variants[chunk_index, cell] # type id and variant in one number
+        order = np.argsort(codes, kind='stable') # grouped by code, chunk by chunk inside a group
+        codes = codes[order]
+        xs = (keys[chunk_index, 0] * CHUNK_SIZE + cell % CHUNK_SIZE)[order].tolist()
+        ys = (keys[chunk_index, 1] * CHUNK_SIZE + cell // CHUNK_SIZE)[order].tolist()
+        groups, starts = np.unique(codes, return_index=True)
+        ends = starts[1:].tolist() + [len(codes)]
+        for code, start, end in zip(groups.tolist(), starts.tolist(), ends):
+            self.locations[(self.type_names[code >> 16], code & 0xFFFF)] = dict.fromkeys(zip(xs[start:end], ys[start:end]))
+        if self.loaded is not None:
+            self.loaded_locations = (self.loaded, {pair: positions.copy() for pair, positions in self.locations.items()})
+
+    def tiles(self):
+        '''
+        every tile on the grid, chunk by chunk
+        () -> (list of {'type', 'variant', 'pos'})
+        '''
+        tiles = []
+        for (cx, cy), chunk in self.chunks.items():
+            for i, type_id in enumerate(chunk.types):
+                if type_id:
+                    tiles.append({'type': self.type_names[type_id], 'variant': chunk.variants[i], 'pos': [cx * CHUNK_SIZE + i % CHUNK_SIZE, cy * CHUNK_SIZE + i // CHUNK_SIZE]})
+        return tiles
 
     def extract(self, id_pairs, keep=False):
         '''
         takes the ids of a tile list, and checks where the tile is in the list
+        goes through the (type, variant) index so it only touches the matches
+        matches come offgrid first then grid, grouped by pair in the order asked for. offgrid ones keep their list order,
+        grid ones go chunk by chunk (row by row inside a chunk) with tiles placed since the load last. the old version
+        went through everything in map order instead, which chunks and .tmap files don't keep
         (List of tile ids: List, want to keep tile: bool) -> (list of matches)
         '''
+        if self.locations is None or self.offgrid_locations is None:
+            self.build_locations()
+        id_pairs = list(dict.fromkeys(tuple(pair) for pair in id_pairs)) # each pair once
         matches = []
         # offgrid
-        for tile in self.offgrid_tiles.copy():
-            if (tile['type'], tile['variant']) in id_pairs: # look for match
-                matches.append(tile.copy())
-                if not keep:
-                    self.offgrid_tiles.remove(tile)
-        
-        for loc in self.tilemap.copy():
-            tile = self.tilemap[loc]
-            if (tile['type'], tile['variant']) in id_pairs:
+        removed = []
+        for pair in id_pairs:
+            for tile in self.offgrid_locations.get(pair, {}).values():
                 matches.append(tile.copy())
-                # change position for the tile we are referncing bc we want it in pixels, 
-                # copy so we dont modify the actual tile in the tilemap
-                matches[-1]['pos'] = matches[-1]['pos'].copy() 
-                matches[-1]['pos'][0] *= self.tile_size # x axis
-                matches[-1]['pos'][1] *= self.tile_size # y axis
+                removed.append(tile)
+        if removed and not keep:
+            # one pass over the list instead of a list.remove per match
+            removed_ids = {id(tile) for tile in removed}
+            self.offgrid_tiles[:] = [tile for tile in self.offgrid_tiles if id(tile) not in removed_ids]
+            for tile in removed:
+                del self.offgrid_locations[(tile['type'], tile['variant'])][id(tile)]
+                self.invalidate_tile(tile['type'], tile['variant'], tile['pos'])
+
+        for tile_type, variant in id_pairs:
+            for x, y in list(self.locations.get((tile_type, variant), ())):
                 if not keep:
-                    del self.tilemap[loc]
+                    self.remove_tile(x, y)
+                # change position for the tile we are referncing bc we want it in pixels
+                matches.append({'type': tile_type, 'variant': variant, 'pos': [x * self.tile_size, y * self.tile_size]})
         return matches
 
     def tiles_around(self, pos):
@@ -63,87 +309,379 @@ class Tilemap:
         # convert pixel position into grid position
         tile_loc = (int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)) # remove the .0 w int()
         for offset in NEIGHBOR_OFFSET:
-            check_loc = str(tile_loc[0] + offset[0]) + ';' + str(tile_loc[1] + offset[1])
-            if check_loc in self.tilemap: # checks if tile is there and not just empty space
-                tiles.append(self.tilemap[check_loc])
-        
+            tile = self.get_tile(tile_loc[0] + offset[0], tile_loc[1] + offset[1])
+            if tile is not None: # checks if tile is there and not just empty space
+                tiles.append(tile)
+
         return tiles
-    
+
+    def reset_types(self, names=()):
+        '''
+        forgets every registered tile type, then registers names in order so their ids are 1, 2, 3...
+        (list of type names)
+        '''
+        self.type_names = [None]
+        self.type_ids = {}
+        self.physics_ids = set()
+        self.autotile_ids = set()
+        for name in names:
+            self.type_id(name)
+
     def save(self, path):
         '''
-        saves the tile map
+        saves the tile map, as json or as a binary map if the path ends with BINARY_EXTENSION
         (file path to save to)
         '''
+        if path.endswith(BINARY_EXTENSION):
+            return self.save_binary(path)
+        tilemap = {str(tile['pos'][0]) + ';' + str(tile['pos'][1]): tile for tile in self.tiles()} # same "x;y" keys the json format has always used
         f = open(path, 'w') # open file
-        json.dump({'tilemap': self.tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid_tiles}, f) # dump object into file
+        json.dump({'tilemap': tilemap, 'tile_size': self.tile_size, 'offgrid': self.offgrid_tiles}, f) # dump object into file
+        f.close()
+
+    def save_binary(self, path):
+        '''
+        saves the tile map in the binary format, see the layout next to BINARY_HEADER
+        (file path to save to)
+        '''
+        # copy chunks still pointing into a mapped file into memory first, the file might be the one we're about to overwrite
+        for chunk in self.chunks.values():
+            if not isinstance(chunk.types, array):
+                chunk.types, chunk.variants = array('H', chunk.types), array('H', chunk.variants)
+
+        names = [name.encode('utf-8') for name in self.type_names[1:]]
+        offgrid = json.dumps(self.offgrid_tiles).encode('utf-8')
+        parts = [BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, self.tile_size, CHUNK_SIZE, len(names), len(self.chunks), len(offgrid))]
+        parts += [struct.pack('<H', len(name)) + name for name in names]
+        parts.append(offgrid)
+        parts.append(bytes(-sum(len(part) for part in parts) % 4))
+
+        table = np.zeros(len(self.chunks), dtype=BINARY_CHUNK)
+        records = []
+        for i, ((cx, cy), chunk) in enumerate(self.chunks.items()):
+            table[i] = (cx, cy, chunk.count, 0)
+            for values in (chunk.types, chunk.variants):
+                if sys.byteorder != 'little':
+                    values = array('H', values)
+                    values.byteswap()
+                records.append(values.tobytes())
+        parts.append(table.tobytes())
+
+        f = open(path, 'wb')
+        f.write(b''.join(parts))
+        f.write(b''.join(records))
         f.close()
-    
+
     def load(self, path):
         '''
-        load the tilemap using the path of the json file
+        load the tilemap using the path of the json file, or of a binary map if it ends with BINARY_EXTENSION
         (file path to access tilemap from)
         '''
+        if path.endswith(BINARY_EXTENSION):
+            return self.load_binary(path)
         f = open(path, 'r')
         map_data = json.load(f)
         f.close()
 
-        self.tilemap = map_data['tilemap']
+        # same as set_tile for every tile, inlined since big maps have a lot of them
+        self.chunks = chunks = {}
+        self.reset_types()
+        type_ids = self.type_ids
+        for tile in map_data['tilemap'].values():
+            pos = tile['pos']
+            x, y = int(pos[0]), int(pos[1])
+            key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+            chunk = chunks.get(key)
+            if chunk is None:
+                chunk = chunks[key] = Chunk()
+            i = ((y & CHUNK_MASK) << CHUNK_SHIFT) | (x & CHUNK_MASK)
+            if not chunk.types[i]:
+                chunk.count += 1
+            chunk.types[i] = type_ids.get(tile['type']) or self.type_id(tile['type'])
+            chunk.variants[i] = tile['variant']
         self.tile_size = map_data['tile_size']
         self.offgrid_tiles = map_data['offgrid']
+        self.build_solid()
+        self.invalidate()
+        self.reset_locations(path)
+
+    def load_binary(self, path):
+        '''
+        loads a binary map by mapping the file, chunks are views into it so nothing gets decoded up front
+        pages of the file only get read once something touches them, edits are copy on write and never reach the file
+        except the tile types: the solid bitmap is still built from every chunk right away, in one numpy pass
+        (about 30ms for a million tiles), so physics lookups never have to check whether a chunk was filled in yet
+        (file path)
+        '''
+        f = open(path, 'rb')
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        f.close() # the map keeps its own handle
+
+        magic, version, tile_size, chunk_size, type_count, chunk_count, offgrid_size = BINARY_HEADER.unpack_from(data, 0)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError(f'{path} is not a version {BINARY_VERSION} binary map')
+        if chunk_size != CHUNK_SIZE:
+            raise ValueError(f'{path} uses {chunk_size} tile chunks, this build uses {CHUNK_SIZE}')
+        offset = BINARY_HEADER.size
+        names = []
+        for i in range(type_count):
+            length = struct.unpack_from('<H', data, offset)[0]
+            names.append(data[offset + 2:offset + 2 + length].decode('utf-8'))
+            offset += 2 + length
+        offgrid = json.loads(data[offset:offset + offgrid_size])
+        offset += offgrid_size
+        offset += -offset % 4
+        table = np.frombuffer(data, dtype=BINARY_CHUNK, count=chunk_count, offset=offset).tolist()
+        offset += BINARY_CHUNK.itemsize * chunk_count
+
+        self.reset_types(names)
+        self.chunks = chunks = {}
+        view = memoryview(data)
+        size = 2 * CHUNK_AREA
+        for cx, cy, count, pad in table:
+            types, variants = view[offset:offset + size].cast('H'), view[offset + size:offset + 2 * size].cast('H')
+            if sys.byteorder != 'little': # the file is little endian, swap into arrays instead
+                types, variants = array('H', types.tobytes()), array('H', variants.tobytes())
+                types.byteswap()
+                variants.byteswap()
+            chunks[(cx, cy)] = Chunk(types, variants, count)
+            offset += 2 * size
+        self.tile_size = tile_size
+        self.offgrid_tiles = offgrid
+        self.build_solid()
+        self.invalidate()
+        self.reset_locations(path)
+
+    def build_solid(self, chunks=None):
+        '''
+        remakes the solid bitmap so it covers a range of chunks (all of them by default) and fills it from the tiles
+        ((first chunk x, first chunk y, last chunk x, last chunk y))
+        '''
+        if chunks is None and self.chunks:
+            keys = list(self.chunks)
+            chunks = (min(k[0] for k in keys), min(k[1] for k in keys), max(k[0] for k in keys), max(k[1] for k in keys))
+        self.solid_chunks = chunks
+        self.solid_rects = {}
+        if chunks is None:
+            self.solid, self.solid_origin, self.solid_size, self.solid_neighbors = bytearray(), (0, 0), (0, 0), []
+            return
+        origin = (chunks[0] * CHUNK_SIZE - 1, chunks[1] * CHUNK_SIZE - 1)
+        width, height = (chunks[2] - chunks[0] + 1) * CHUNK_SIZE + 2, (chunks[3] - chunks[1] + 1) * CHUNK_SIZE + 2
+        self.solid = bytearray(width * height)
+        self.solid_origin, self.solid_size = origin, (width, height)
+        self.solid_neighbors = [offset[1] * width + offset[0] for offset in NEIGHBOR_OFFSET]
+
+        keys = [key for key in self.chunks if chunks[0] <= key[0] <= chunks[2] and chunks[1] <= key[1] <= chunks[3]]
+        if not keys:
+            return
+        # every chunk at once: which cells are solid, dropped into a (chunk row, chunk column, row, column) grid, then flattened
+        types = np.array([np.frombuffer(self.chunks[key].types, dtype=np.uint16) for key in keys])
+        solid = np.isin(types, np.array(sorted(self.physics_ids), dtype=np.uint16)).reshape(-1, CHUNK_SIZE, CHUNK_SIZE)
+        keys = np.array(keys)
+        blocks = np.zeros((chunks[3] - chunks[1] + 1, chunks[2] - chunks[0] + 1, CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint8)
+        blocks[keys[:, 1] - chunks[1], keys[:, 0] - chunks[0]] = solid
+        grid = np.frombuffer(self.solid, dtype=np.uint8).reshape(height, width)
+        grid[1:-1, 1:-1] = blocks.transpose(0, 2, 1, 3).reshape(height - 2, width - 2)
+
+    def set_solid(self, x, y, solid):
+        '''
+        keeps the solid bitmap in sync with one tile, growing it if a solid tile lands outside of it
+        (grid x, grid y, whether the tile there is solid)
+        '''
+        if self.solid_chunks is None or not (self.solid_chunks[0] <= x >> CHUNK_SHIFT <= self.solid_chunks[2] and self.solid_chunks[1] <= y >> CHUNK_SHIFT <= self.solid_chunks[3]):
+            if not solid:
+                return # outside the bitmap already counts as empty
+            cx, cy = x >> CHUNK_SHIFT, y >> CHUNK_SHIFT
+            old = self.solid_chunks or (cx, cy, cx, cy)
+            self.build_solid((min(old[0], cx), min(old[1], cy), max(old[2], cx), max(old[3], cy)))
+            return # the rebuild read the tile from the chunks
+        i = (y - self.solid_origin[1]) * self.solid_size[0] + x - self.solid_origin[0]
+        self.solid[i] = solid
+        if not solid:
+            self.solid_rects.pop(i, None)
+
+    def solid_rect(self, i):
+        '''
+        returns the Rect of the tile at an index into the solid bitmap, shared between calls so don't move it
+        (index) -> (Rect)
+        '''
+        rect = self.solid_rects.get(i)
+        if rect is None:
+            width = self.solid_size[0]
+            rect = self.solid_rects[i] = pygame.Rect((i % width + self.solid_origin[0]) * self.tile_size, (i // width + self.solid_origin[1]) * self.tile_size, self.tile_size, self.tile_size)
+        return rect
 
     def solid_check(self, pos):
         '''
         checks the position and returns the location of any solide tiles next to it
-        (pos: tuple) -> (str)
+        (pos: tuple) -> (tile)
+        '''
+        x, y = int(pos[0] // self.tile_size), int(pos[1] // self.tile_size) # gives tile location
+        origin, (width, height) = self.solid_origin, self.solid_size
+        bx, by = x - origin[0], y - origin[1]
+        if 0 <= bx < width and 0 <= by < height and self.solid[by * width + bx]:
+            return self.get_tile(x, y)
+
+    def solid_check_many(self, positions):
+        '''
+        solid_check for a lot of positions at once, one array lookup instead of a call each
+        (list of positions) -> (numpy array of bools, True where the position is in a solid tile)
         '''
-        tile_loc = str(int(pos[0] // self.tile_size)) + ';' + str(int(pos[1] // self.tile_size)) # gives tile location
-        if tile_loc in self.tilemap:
-            if self.tilemap[tile_loc]['type'] in PHYSICS_TILES:
-                return self.tilemap[tile_loc]
-    
+        cells = np.floor_divide(np.asarray(positions, dtype=float).reshape(-1, 2), self.tile_size).astype(int) - self.solid_origin
+        width, height = self.solid_size
+        inside = (cells[:, 0] >= 0) & (cells[:, 0] < width) & (cells[:, 1] >= 0) & (cells[:, 1] < height)
+        hits = np.zeros(len(cells), dtype=bool)
+        hits[inside] = np.frombuffer(self.solid, dtype=np.uint8).reshape(height, width)[cells[inside, 1], cells[inside, 0]] != 0
+        return hits
+
     def autotile(self):
         '''
         auto tiles depending on it's neightbors
         '''
-        for loc in self.tilemap:
-            tile = self.tilemap[loc]
-            neighbors = set()
-            for shift in [(1, 0), (-1, 0), (0, -1), (0, 1)]:
-                check_loc = str(tile['pos'][0] + shift[0]) + ';' + str(tile['pos'][1] + shift[1])
-                if check_loc in self.tilemap:
-                    if self.tilemap[check_loc]['type'] == tile['type']: # check if neighbors are same type/group
-                        neighbors.add(shift)
-            neighbors = tuple(sorted(neighbors)) #tuple(sorted() solves this, + we can't use list as a key therefore tuple
-            if (tile['type'] in AUTOTILE_TYPES) and (neighbors in AUTOTILE_MAP):
-                tile['variant'] = AUTOTILE_MAP[neighbors]
-
-    
+        for (cx, cy), chunk in list(self.chunks.items()):
+            for i, type_id in enumerate(chunk.types):
+                if type_id in self.autotile_ids:
+                    self.autotile_tile(cx * CHUNK_SIZE + i % CHUNK_SIZE, cy * CHUNK_SIZE + i // CHUNK_SIZE)
+
+    def autotile_tile(self, x, y):
+        '''
+        picks the variant of one tile from which of its 4 neighbors are the same type
+        (grid x, grid y)
+        '''
+        chunk, i = self._cell(x, y)
+        if chunk is None or chunk.types[i] not in self.autotile_ids:
+            return
+        type_id = chunk.types[i]
+        mask = 0
+        for shift, bit in AUTOTILE_BITS:
+            if self.type_at(x + shift[0], y + shift[1]) == type_id: # check if neighbors are same type/group
+                mask |= bit
+        variant = AUTOTILE_VARIANTS[mask]
+        if variant is not None and variant != chunk.variants[i]:
+            tile_type = self.type_names[type_id]
+            self.invalidate_tile(tile_type, chunk.variants[i], (x * self.tile_size, y * self.tile_size))
+            self.unlocate(tile_type, chunk.variants[i], (x, y))
+            chunk.variants[i] = variant
+            self.invalidate_tile(tile_type, variant, (x * self.tile_size, y * self.tile_size))
+            self.locate(tile_type, variant, (x, y))
+
+    def autotile_around(self, x, y):
+        '''
+        autotiles a cell and its 4 neighbors, all that can change after placing or removing the tile there
+        (grid x, grid y)
+        '''
+        self.autotile_tile(x, y)
+        for shift, bit in AUTOTILE_BITS:
+            self.autotile_tile(x + shift[0], y + shift[1])
+
     def physics_rects_around(self, pos):
         '''
         filters nearby tiles to check if they have physics
-        (position) -> (list of rectangles) 
+        the rects are cached and shared between calls, don't move them
+        (position) -> (list of rectangles)
         '''
+        x, y = int(pos[0] // self.tile_size) - self.solid_origin[0], int(pos[1] // self.tile_size) - self.solid_origin[1]
+        width, height = self.solid_size
+        solid = self.solid
+        if 0 < x < width - 1 and 0 < y < height - 1: # whole neighborhood is inside the bitmap
+            i = y * width + x
+            return [self.solid_rect(i + n) for n in self.solid_neighbors if solid[i + n]]
+        # near or past the edge, bounds check every neighbor
         rects = []
-        for tile in self.tiles_around(pos):
-            if tile['type'] in PHYSICS_TILES:
-                rects.append(pygame.Rect(tile['pos'][0] * self.tile_size, tile['pos'][1] * self.tile_size, self.tile_size, self.tile_size))
+        for offset_x, offset_y in NEIGHBOR_OFFSET:
+            nx, ny = x + offset_x, y + offset_y
+            if 0 <= nx < width and 0 <= ny < height and solid[ny * width + nx]:
+                rects.append(self.solid_rect(ny * width + nx))
         return rects
 
-    def render(self, surf, offset=(0, 0)):
+    def invalidate(self):
+        '''
+        throws away every baked chunk surface, they get baked again when they're next on screen
+        '''
+        self.surfaces.clear()
+
+    def invalidate_tile(self, tile_type, variant, pos):
         '''
-        renders tilemap on surface
-        (screen surface)
+        throws away the baked surfaces of the chunks a tile's image covers
+        (type name, variant, position in px)
+        '''
+        variants = self.game.assets.get(tile_type)
+        size = variants[variant].get_size() if variants else (self.tile_size, self.tile_size) # no image (e.g. spawners in game), it never gets drawn anyway
+        chunk_px = CHUNK_SIZE * self.tile_size
+        left, top = int(pos[0] // chunk_px), int(pos[1] // chunk_px)
+        right, bottom = int((pos[0] + size[0] - 1) // chunk_px), int((pos[1] + size[1] - 1) // chunk_px)
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                self.surfaces.pop((cx, cy), None)
+
+    def bake(self, cx, cy):
         '''
-        # rendering offgrid tiles, decor gets rendered first (behind the actual tiles)
+        draws everything that lands in a chunk onto one surface, in the same order render draws tiles
+        tiles just up and left of the chunk are included too in case their images hang over into this one
+        (chunk x, chunk y) -> (surface, None if nothing lands in the chunk)
+        '''
+        chunk_px = CHUNK_SIZE * self.tile_size
+        origin = (cx * chunk_px, cy * chunk_px)
+        area = pygame.Rect(origin, (chunk_px, chunk_px))
+        blits = []
+        # offgrid first, decor goes behind the actual tiles
         for tile in self.offgrid_tiles:
-            surf.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0] - offset[0], tile['pos'][1] - offset[1]))
-
-        # for x in range(top left tile x position [tile coord], to top  right edge of screen [tile coord])
-        for x in range(offset[0] // self.tile_size, (offset[0] + surf.get_width()) // self.tile_size + 1):
-            for y in range(offset[1] // self.tile_size, (offset[1] + surf.get_height()) // self.tile_size + 1):
-                loc = str(x) + ';' + str(y)
-                if loc in self.tilemap:
-                    tile = self.tilemap[loc]
-                    # pos * tile size bc it's in terms of grid within tilemap currently, we want position in terms of pixels
-                    # (tile in assets, rendering pos)
-                    surf.blit(self.game.assets[tile['type']][tile['variant']], (tile['pos'][0] * self.tile_size - offset[0], tile['pos'][1] * self.tile_size - offset[1]))
\ No newline at end of file
+            img = self.game.assets[tile['type']][tile['variant']]
+            if area.colliderect(pygame.Rect(tile['pos'], img.get_size())):
+                blits.append((img, (tile['pos'][0] - origin[0], tile['pos'][1] - origin[1])))
+
+        assets = [None] + [self.game.assets.get(name) for name in self.type_names[1:]] # type id -> variants
+        # how many tiles up/left an image bigger than a tile can reach in from
+        biggest = max([max(img.get_size()) for variants in assets[1:] if variants for img in variants] + [self.tile_size])
+        reach = min(CHUNK_SIZE, -(-(biggest - self.tile_size) // self.tile_size))
+        # column by column like render always did, so overlapping tiles stack the same way
+        for x in range(cx * CHUNK_SIZE - reach, (cx + 1) * CHUNK_SIZE):
+            for y in range(cy * CHUNK_SIZE - reach, (cy + 1) * CHUNK_SIZE):
+                chunk, i = self._cell(x, y)
+                if chunk is None or not chunk.types[i]:
+                    continue
+                img = assets[chunk.types[i]][chunk.variants[i]]
+                pos = (x * self.tile_size - origin[0], y * self.tile_size - origin[1])
+                if pos[0] + img.get_width() > 0 and pos[1] + img.get_height() > 0:
+                    blits.append((img, pos))
+
+        if not blits:
+            return None
+        surface = pygame.Surface((chunk_px, chunk_px), pygame.SRCALPHA)
+        surface.blits(blits, doreturn=False)
+        if self.render_scale != 1:
+            # edges rounded the same way render places them, so neighbouring chunks meet without gaps
+            left, top = self.chunk_edge(cx), self.chunk_edge(cy)
+            surface = pygame.transform.scale(surface, (self.chunk_edge(cx + 1) - left, self.chunk_edge(cy + 1) - top))
+        surface.set_alpha(255, pygame.RLEACCEL) # never drawn on again, run length encoding makes blitting mostly empty chunks a lot cheaper
+        return surface
+
+    def chunk_edge(self, c):
+        '''
+        where a chunk starts on the display at the render scale, before the offset
+        (chunk x or y) -> (display px)
+        '''
+        return round(c * CHUNK_SIZE * self.tile_size * self.render_scale)
+
+    def render(self, surf, offset=(0, 0), sprites=None):
+        '''
+        renders tilemap on surface, one blit per chunk on screen
+        chunks get baked the first time they show up and kept until a tile in them changes
+        (screen surface, offset in world px, list to add the drawn (chunk surface, position) to)
+        '''
+        chunk_px = CHUNK_SIZE * self.tile_size
+        scale = self.render_scale
+        surfaces = self.surfaces
+        width, height = math.ceil(surf.get_width() / scale), math.ceil(surf.get_height() / scale) # what's on screen in world px
+        for cy in range(offset[1] // chunk_px, (offset[1] + height) // chunk_px + 1):
+            for cx in range(offset[0] // chunk_px, (offset[0] + width) // chunk_px + 1):
+                key = (cx, cy)
+                if key in surfaces:
+                    surface = surfaces[key]
+                else:
+                    surface = surfaces[key] = self.bake(cx, cy)
+                if surface is not None:
+                    pos = (cx * chunk_px - offset[0], cy * chunk_px - offset[1]) if scale == 1 else (self.chunk_edge(cx) - offset[0] * scale, self.chunk_edge(cy) - offset[1] * scale)
+                    surf.blit(surface, pos)
+                    if sprites is not None:
+                        sprites.append((surface, pos))
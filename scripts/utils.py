@@ -1,27 +1,24 @@
-import os
+import math
+from collections import OrderedDict
 
 import pygame
 
 BASE_IMG_PATH = 'data/images/'
+WORLD_SIZE = (1140, 810) # what the game plays out in, spawn ranges and edges come from it whatever the window size
 
-def load_image(path):
-    '''
-    short cut to load a single image, removes the background and increasing preformance
-    (file path) -> (img)
-    '''
-    img = pygame.image.load(BASE_IMG_PATH + path).convert() # helps preformance when rendering
-    #img.set_colorkey((0, 0, 0)) # removes the background in png images
-    return img
+class NullSound:
+    def __init__(self, path=None):
+        '''
+        stands in for a pygame Sound when there's no audio, e.g. headless runs
+        (file path, ignored)
+        '''
+        self.path = path
 
-def load_images(path):
-    '''
-    loads all images within a collection of images
-    (file path) -> (List of images within file)
-    '''
-    images = []
-    for img_name in sorted(os.listdir(BASE_IMG_PATH + path)):  # gives all files in the path, sorted makes it consistent with other operating systems (starting at 0->8)
-        images.append(load_image(path + '/' + img_name))
-    return images
+    def play(self, *args, **kwargs):
+        pass
+
+    def set_volume(self, volume):
+        pass
 
 
 class Animation:
@@ -61,4 +58,190 @@ class Animation:
         '''
         returns the current image of the animation
         '''
-        return self.images[int(self.frame / self.img_duration)] # divides frame by how long each image shows for
\ No newline at end of file
+        return self.images[int(self.frame / self.img_duration)] # divides frame by how long each image shows for
+
+
+class LRUCache:
+    def __init__(self, max_size, sizeof=None):
+        '''
+        least recently used cache, drops the oldest entries once the total size goes past max_size
+        (max size, fn giving the size of a value, defaults to counting entries)
+        '''
+        self.max_size = max_size
+        self.sizeof = sizeof or (lambda value: 1)
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        '''
+        returns the cached value and marks it as most recently used
+        (key, default) -> (value)
+        '''
+        if key not in self.entries:
+            return default
+        self.entries.move_to_end(key)
+        return self.entries[key][0]
+
+    def put(self, key, value):
+        '''
+        adds a value to the cache, evicting the least recently used values if it's full
+        (key, value) -> (value)
+        '''
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+        size = self.sizeof(value)
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size and len(self.entries) > 1: # always keep the newest value, even if it's bigger than the cap
+            self.size -= self.entries.popitem(last=False)[1][1]
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+def scale_image(img, scale):
+    '''
+    an image resized for a render scale, nearest neighbour so the pixel art stays sharp
+    (image, render scale) -> (scaled copy, the image itself at a scale of 1)
+    '''
+    if scale == 1:
+        return img
+    return pygame.transform.scale(img, (max(1, round(img.get_width() * scale)), max(1, round(img.get_height() * scale))))
+
+
+def surface_bytes(surf):
+    '''
+    memory used by a surface's pixels
+    (surface) -> (int)
+    '''
+    return surf.get_pitch() * surf.get_height()
+
+
+class RotationCache:
+    def __init__(self, angle_step=1, max_bytes=32 * 1024 * 1024):
+        '''
+        caches rotated copies of sprite stacks so we dont call transform.rotate on every layer every frame
+        angles are snapped to angle_step degrees, memory is capped at max_bytes (LRU)
+        the cap grows to fit every angle of every stack that's been rotated, so a big stack can't thrash the cache
+        (angle step in degrees, memory cap in bytes before any stack is registered)
+        '''
+        self.buckets = max(1, round(360 / angle_step)) # number of angles we keep per stack
+        self.angle_step = 360 / self.buckets # adjusted so the steps always wrap around evenly at 360
+        self.max_bytes = max_bytes
+        self.stacks = {} # id(images) -> (images, bytes for every angle of them), what the cap is sized from
+        self.cache = LRUCache(max_bytes, sizeof=lambda entry: sum(surface_bytes(img) for img in entry[1]))
+
+    def set_bytes(self, images):
+        '''
+        about how much memory every angle of a stack takes, from the bounding box of each layer rotated to each angle
+        (List of images) -> (bytes, rounded up)
+        '''
+        total = 0
+        for bucket in range(self.buckets):
+            angle = math.radians(bucket * self.angle_step)
+            cos, sin = abs(math.cos(angle)), abs(math.sin(angle))
+            for img in images:
+                w, h = img.get_size()
+                total += math.ceil(w * cos + h * sin) * math.ceil(w * sin + h * cos) * 4 # rotate always gives 32 bit surfaces
+        return total
+
+    def register(self, images):
+        '''
+        raises the cap so every angle of a stack fits alongside the other registered stacks, done the first time a stack is rotated
+        (List of images)
+        '''
+        if id(images) in self.stacks:
+            return
+        # keep a reference to the stack so its id can't be reused
+        self.stacks[id(images)] = (images, self.set_bytes(images))
+        self.cache.max_size = max(self.max_bytes, sum(size for images, size in self.stacks.values()))
+
+    def bucket(self, angle):
+        '''
+        snaps an angle to the closest cached step
+        (angle in degrees) -> (int)
+        '''
+        return round(angle / self.angle_step) % self.buckets
+
+    def get(self, images, angle):
+        '''
+        returns every layer of the stack rotated to angle, rotating and caching them the first time
+        (List of images, angle in degrees) -> (List of rotated images)
+        '''
+        key = (id(images), self.bucket(angle))
+        entry = self.cache.get(key)
+        if entry is None:
+            self.register(images)
+            rotation = key[1] * self.angle_step
+            # keep a reference to the stack so its id can't be reused while the entry is alive
+            entry = self.cache.put(key, (images, [pygame.transform.rotate(img, rotation) for img in images]))
+        return entry[1]
+
+    def preload(self, images):
+        '''
+        fills the cache with every angle of a stack up front, so rotating doesn't hitch during play
+        (List of images)
+        '''
+        self.register(images)
+        for bucket in range(self.buckets):
+            self.get(images, bucket * self.angle_step)
+
+
+
+class SpriteStack:
+    def __init__(self, images, spread=1, rotations=None, max_bytes=16 * 1024 * 1024, flatten=True, scale=1):
+        '''
+        a sprite stack asset, every layer is drawn i * spread px above the one below it
+        when flatten is on, the rotated layers are baked into one surface per angle so the stack draws with a single blit
+        (List of images bottom layer first, spread in px, RotationCache to take the layer by layer rotations and the angle step from
+         (pass the game's so every stack shares one cache and one cap, None makes one), memory cap of the flattened images in bytes, flatten: bool,
+         render scale, the layers and spread get scaled once here so every rotation is already the size it's drawn at)
+        '''
+        self.images = [scale_image(img, scale) for img in images] if scale != 1 else images
+        self.spread = spread * scale
+        self.flatten = flatten
+        self.rotations = rotations if rotations is not None else RotationCache() # layer by layer rotations, used when not flattened
+        self.cache = LRUCache(max_bytes, sizeof=lambda entry: surface_bytes(entry[0]))
+
+    def __len__(self):
+        return len(self.images)
+
+    def img(self, rotation):
+        '''
+        returns the flattened stack for a rotation and where its top left sits relative to the bottom right of the bottom layer
+        (angle in degrees) -> (surface, (x offset, y offset))
+        '''
+        bucket = self.rotations.bucket(rotation)
+        entry = self.cache.get(bucket)
+        if entry is None:
+            layers = [pygame.transform.rotate(img, bucket * self.rotations.angle_step) for img in self.images]
+            # layer i gets drawn at (-width, -height - i * spread) from the anchor, find the box around all of them
+            left = min(-layer.get_width() for layer in layers)
+            top = min(-layer.get_height() - i * self.spread for i, layer in enumerate(layers))
+            bottom = max(-i * self.spread for i in range(len(layers)))
+            flat = pygame.Surface((-left, int(bottom - top) + 1), pygame.SRCALPHA)
+            for i, layer in enumerate(layers):
+                flat.blit(layer, (-layer.get_width() - left, -layer.get_height() - i * self.spread - top))
+            entry = self.cache.put(bucket, (flat, (left, top)))
+        return entry
+
+    def render(self, surf, pos, rotation):
+        '''
+        draws the stack with the bottom right corner of the bottom layer at pos
+        (surface, position, angle in degrees) -> (list of (image, position) it drew)
+        '''
+        if self.flatten:
+            flat, offset = self.img(rotation)
+            drawn = [(flat, (pos[0] + offset[0], pos[1] + offset[1]))]
+        else:
+            drawn = [(layer, (pos[0] - layer.get_width(), pos[1] - layer.get_height() - i * self.spread)) for i, layer in enumerate(self.rotations.get(self.images, rotation))]
+        surf.blits(drawn, doreturn=False)
+        return drawn
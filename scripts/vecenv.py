@@ -0,0 +1,209 @@
+import numpy as np
+
+from scripts.pool import MOVEMENT, HITBOX_OFFSET
+from scripts.utils import WORLD_SIZE
+
+NOOP, LEFT, RIGHT = 0, 1, 2 # actions, which rotate key is held this tick
+
+BOUNDS = (WORLD_SIZE[0] + 30, WORLD_SIZE[1] + 20) # trueWidth, trueHeight in Game.step and Player.update
+PLAYER_START = (600, 400) # where load_level puts the player
+PLAYER_SIZE = (32, 32)
+PLAYER_HITBOX_OFFSET = (-33, -50) # same as Player.rect()
+PLAYER_SPEED = 2.2
+ROTATION_SPEED = 1.6
+ENTITY_SIZE = 16 # enemies and bosses are 16x16
+DEAD_TICKS = 30 # ticks after dying before the game is over
+DIST_KEY = 1 << 24 # bigger than any squared distance between the player and something still on screen
+
+class VecEnv:
+    def __init__(self, count, seed=None, max_enemies=50, nearest=8, rng=None):
+        '''
+        count independent games stepped in lockstep, everything held as numpy arrays, no window, no clock and no drawing
+        follows Game.step, Player.update and Enemies/Boss.update tick for tick: rotation, spawning, movement,
+        running into the player and the boundary deaths. like EntityPool it ignores tile collisions (the maps only have spawners)
+        enemies and bosses of every game share one set of flat arrays tagged with their game, so the work goes with how many are alive
+        a game that's over starts again on the next step, like pressing L right away
+        (number of games, seed, Game.max_enemies, how many of the closest enemies go into an observation,
+         numpy Generator (or anything with random and integers) to draw from instead of seed)
+        '''
+        self.count = count
+        self.max_enemies = max_enemies
+        self.nearest = nearest
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.rotation = np.zeros(count)
+        self.movement = np.zeros((count, 4), dtype=bool) # left, right, up, down like Game.movement
+        self.player = np.zeros((count, 2))
+        self.dead = np.zeros(count, dtype=np.int64)
+        self.game_over = np.zeros(count, dtype=bool)
+        self.start = np.zeros(count, dtype=bool)
+        self.counter = np.zeros(count, dtype=np.int64)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.spawn_timer = np.zeros(count)
+        self.spawn_interval = np.zeros(count)
+        # every enemy and boss alive in any game, in spawn order
+        self.game = np.zeros(0, dtype=np.int64) # which game it's in
+        self.kind = np.zeros(0, dtype=np.int8) # index into pool.KINDS
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.reset()
+
+    def reset(self, mask=None):
+        '''
+        starts games over, like Game.load_level
+        (bool array of which games, None for all) -> (observations)
+        '''
+        mask = np.ones(self.count, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        self.rotation[mask] = 0
+        self.movement[mask] = False
+        self.player[mask] = PLAYER_START
+        self.dead[mask] = 0
+        self.game_over[mask] = False
+        self.start[mask] = False
+        self.counter[mask] = 0
+        self.score[mask] = 0
+        self.spawn_timer[mask] = 0
+        self.spawn_interval[mask] = 100
+        self.keep(~mask[self.game])
+        return self.observe()
+
+    def keep(self, keep):
+        '''
+        drops the enemies and bosses that aren't kept
+        (bool array, one per entity)
+        '''
+        self.game, self.kind, self.x, self.y = self.game[keep], self.kind[keep], self.x[keep], self.y[keep]
+
+    def spawn(self, games, kind, pos):
+        '''
+        adds an enemy or boss to each of some games
+        (indices of games, 0 for an enemy or 1 for a boss, [[x, y], ...] one per game)
+        '''
+        games = np.asarray(games, dtype=np.int64)
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        self.game = np.concatenate([self.game, games])
+        self.kind = np.concatenate([self.kind, np.full(len(games), kind, dtype=np.int8)])
+        self.x = np.concatenate([self.x, pos[:, 0]])
+        self.y = np.concatenate([self.y, pos[:, 1]])
+
+    def enemy_counts(self):
+        '''
+        how many enemies (not bosses) each game has
+        () -> (int array, one per game)
+        '''
+        return np.bincount(self.game[self.kind == 0], minlength=self.count)
+
+    def spawn_positions(self, n, side):
+        '''
+        where spawn_enemy/spawn_boss put something, along the top (side 1) or down the left (side 0)
+        (how many, side per one) -> ([[x, y], ...])
+        '''
+        top = side == 1
+        pos = np.empty((n, 2))
+        pos[top, 0] = self.rng.integers(50, WORLD_SIZE[0] - 50, size=int(top.sum()), endpoint=True)
+        pos[top, 1] = 60
+        pos[~top, 0] = 50
+        pos[~top, 1] = self.rng.integers(60, WORLD_SIZE[1] + 20, size=int((~top).sum()), endpoint=True)
+        return pos
+
+    def player_rects(self):
+        left = np.trunc(self.player[:, 0] + PLAYER_HITBOX_OFFSET[0])
+        top = np.trunc(self.player[:, 1] + PLAYER_HITBOX_OFFSET[1])
+        return left, top, left + PLAYER_SIZE[0], top + PLAYER_SIZE[1]
+
+    def step(self, actions):
+        '''
+        advances every game one tick
+        (array of NOOP/LEFT/RIGHT, one per game) -> (observations, scores, done flags)
+        scores and done are from the end of the tick, games that finished are already reset in the observations
+        '''
+        actions = np.asarray(actions)
+        left, right = actions == LEFT, actions == RIGHT
+
+        # input rotation, pressing either key starts the game (ignored once it's over)
+        self.start |= (left | right) & ~self.game_over
+        self.rotation = np.where(left, np.mod(self.rotation + ROTATION_SPEED, 360), self.rotation)
+        self.rotation = np.where(right, np.mod(self.rotation - ROTATION_SPEED, 360), self.rotation)
+        r = self.rotation
+        for quadrant, flags in [((r > 90) & (r < 180), (1, 0, 0, 1)), ((r < 90) & (r > 0), (1, 0, 1, 0)),
+                                ((r > 180) & (r < 270), (0, 1, 0, 1)), (r > 270, (0, 1, 1, 0))]:
+            self.movement[quadrant] = flags # exactly 0, 90, 180 and 270 keep the last flags
+
+        # dying counts up to game over
+        dying = self.dead != 0
+        self.dead[dying] += 1
+        over = self.dead > DEAD_TICKS
+        self.movement[over] = False
+        self.game_over |= over
+
+        # spawning
+        can = self.start & (self.enemy_counts() < self.max_enemies)
+        self.spawn_timer[can] += self.rng.random(int(can.sum())) * self.score[can]
+        go = np.flatnonzero(can & (self.spawn_timer >= self.spawn_interval) & (self.dead == 0))
+        if len(go):
+            self.spawn(go, 0, self.spawn_positions(len(go), self.rng.integers(0, 1, size=len(go), endpoint=True)))
+            self.spawn_interval[go] = np.maximum(40, self.spawn_interval[go] - self.spawn_timer[go])
+            self.spawn_timer[go] = 0
+            bosses = go[self.score[go] > 10]
+            roll = self.rng.integers(0, 8, size=len(bosses), endpoint=True)
+            bosses, roll = bosses[roll < 2], roll[roll < 2] # 2 out of 9 rolls spawn one
+            self.spawn(bosses, 1, self.spawn_positions(len(bosses), roll))
+
+        # enemies and bosses move, then die running into the player or leaving the screen
+        self.x += MOVEMENT[self.kind, 0]
+        self.y += MOVEMENT[self.kind, 1]
+        p_left, p_top, p_right, p_bottom = self.player_rects()
+        x, y, game = self.x, self.y, self.game
+        e_left, e_top = np.trunc(x + HITBOX_OFFSET[0]), np.trunc(y + HITBOX_OFFSET[1])
+        hit = (e_left < p_right[game]) & (p_left[game] < e_left + ENTITY_SIZE) & (e_top < p_bottom[game]) & (p_top[game] < e_top + ENTITY_SIZE)
+        gone = (y >= BOUNDS[1]) | (x < 50) | (y < 60) | (x > BOUNDS[0])
+        self.dead += np.bincount(game[hit], minlength=self.count)
+        self.keep(~(hit | gone))
+
+        # the player moves and scores while alive, and dies touching the edges
+        moving = (self.dead == 0) & self.start
+        self.counter[moving] += 1
+        self.score[moving] = self.counter[moving] // 60
+        m = self.movement[moving]
+        player = self.player[moving]
+        player[:, 0] += (m[:, 1].astype(int) - m[:, 0]) * PLAYER_SPEED
+        player[:, 1] += (m[:, 3].astype(int) - m[:, 2]) * PLAYER_SPEED
+        dead = self.dead[moving]
+        x, y = player[:, 0], player[:, 1]
+        for out, axis, limit in [(y >= BOUNDS[1], 1, BOUNDS[1]), (x < 50, 0, 50), (y < 60, 1, 60), (x > BOUNDS[0], 0, BOUNDS[0])]: # same order as Player.update
+            dead += out
+            player[out, axis] = limit
+        self.player[moving] = player
+        self.dead[moving] = dead
+
+        scores, done = self.score.copy(), self.game_over.copy()
+        if done.any():
+            self.reset(done)
+        return self.observe(), scores, done
+
+    def observe(self):
+        '''
+        what an agent sees of each game
+        () -> (float32 array, one row per game: player x, player y, rotation, dead ticks,
+               then dx, dy, kind + 1 for the closest enemies and bosses, closest first, zeros where there aren't enough)
+        '''
+        obs = np.zeros((self.count, 4 + 3 * self.nearest), dtype=np.float32)
+        obs[:, :2] = self.player
+        obs[:, 2] = self.rotation
+        obs[:, 3] = self.dead
+        if not len(self.game) or not self.nearest:
+            return obs
+        dx = self.x - self.player[:, 0][self.game]
+        dy = self.y - self.player[:, 1][self.game]
+        # by game, then closest first, in one sort: squared distances on screen stay well under DIST_KEY
+        order = np.argsort(self.game * DIST_KEY + (dx * dx + dy * dy))
+        game = self.game[order]
+        counts = np.bincount(game, minlength=self.count)
+        rank = np.arange(len(order)) - (np.cumsum(counts) - counts)[game] # place within its game
+        near = rank < self.nearest
+        order = order[near]
+        cells = game[near] * obs.shape[1] + 4 + 3 * rank[near] # flat index of the dx column
+        flat = obs.reshape(-1)
+        flat[cells] = dx[order]
+        flat[cells + 1] = dy[order]
+        flat[cells + 2] = self.kind[order] + 1
+        return obs
@@ -0,0 +1,76 @@
+import sys
+import csv
+import json
+import argparse
+
+import numpy as np
+
+from scripts.telemetry import FIELDS
+
+SKIP = {'frame', 'time'}
+
+def read(path):
+    '''
+    reads a telemetry file written by scripts.telemetry, csv or jsonl by extension
+    (path) -> ({column name: array, blanks as nan})
+    '''
+    with open(path, newline='') as f:
+        if path.endswith('.jsonl'):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    columns = {}
+    for name in FIELDS:
+        values = [row.get(name) for row in rows]
+        columns[name] = np.array([np.nan if value in (None, '') else float(value) for value in values])
+    return columns
+
+def trend(t, values):
+    '''
+    how fast a column grows, a straight line fit over the whole run plus the start vs end averages
+    (times in seconds, values) -> ((change per minute, mean of the first 10%, mean of the last 10%), None if too few values)
+    '''
+    ok = ~np.isnan(values)
+    t, values = t[ok], values[ok]
+    if len(values) < 10 or t[-1] == t[0]:
+        return None
+    slope = np.polyfit(t, values, 1)[0] * 60
+    tenth = max(1, len(values) // 10)
+    return slope, values[:tenth].mean(), values[-tenth:].mean()
+
+def summarize(columns, growth=0.1):
+    '''
+    percentiles and growth of every column
+    (columns from read(), start to end change past which a column gets flagged, 0.1 = 10%) -> (list of lines)
+    '''
+    t = columns['time']
+    minutes = (t[-1] - t[0]) / 60 if len(t) > 1 else 0
+    lines = [f'{len(t)} frames over {minutes:.1f} minutes', '']
+    lines.append(f"{'column':15s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s} {'/minute':>9s} {'start':>9s} {'end':>9s}")
+    for name in FIELDS:
+        if name in SKIP:
+            continue
+        values = columns[name]
+        measured = values[~np.isnan(values)]
+        if not len(measured):
+            continue
+        p50, p95, p99 = np.percentile(measured, [50, 95, 99])
+        line = f'{name:15s} {p50:9.2f} {p95:9.2f} {p99:9.2f} {measured.max():9.2f}'
+        fit = trend(t, values)
+        if fit is not None:
+            slope, start, end = fit
+            line += f' {slope:+9.2f} {start:9.2f} {end:9.2f}'
+            if slope > 0 and end > start * (1 + growth) and end - start >= 1:
+                line += '  GROWING'
+        lines.append(line)
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='summarize a telemetry file: percentiles and growth trends of every column')
+    parser.add_argument('path', help='.csv or .jsonl file written with Game(telemetry=...)')
+    parser.add_argument('--growth', type=float, default=0.1, help='start to end change past which a column is flagged as growing (0.1 = 10%%)')
+    args = parser.parse_args(argv)
+    print('\n'.join(summarize(read(args.path), args.growth)))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])